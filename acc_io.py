@@ -0,0 +1,68 @@
+import os
+import pandas as pd
+
+
+# Recording formats (chosen by the file extension):
+FORMATS = ('.csv', '.feather', '.parquet', '.npy')
+
+
+# Checks at startup that the format can be written (pyarrow for the columnar formats), before any acquisition:
+
+def check_format(ext):
+    if ext not in FORMATS:
+        raise ValueError('Recording format not supported: ' + ext)
+    if ext in ('.feather', '.parquet'):
+        import pyarrow  # noqa: F401
+
+
+# Saves a recording (compressed columnar formats need pyarrow), into fobj when given:
+
+def save_acc(df, nomefile, compression='zstd', level=3, fobj=None):
+
+    ext = os.path.splitext(nomefile)[1]
+    dest = nomefile if fobj is None else fobj
+
+    if ext == '.feather':
+        from pyarrow import feather
+        feather.write_feather(df.reset_index(drop=True), dest, compression=compression,
+                              compression_level=level)
+    elif ext == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), dest, compression=compression,
+                       compression_level=level)
+    elif ext == '.npy':
+        # Memory-mappable structured array (chunked post-processing of long recordings)
+        if fobj is None:
+            from chunked import save_npy
+            save_npy(df, nomefile)
+        else:
+            import numpy as np
+            np.save(fobj, df.astype(float).to_records(index=False))
+    else:
+        df.to_csv(dest, sep=';', index=False)
+
+
+# Loads a recording, only the requested columns are read from the file:
+
+def load_acc(nomefile, columns=None):
+
+    ext = os.path.splitext(nomefile)[1]
+
+    if isinstance(columns, str):
+        columns = [columns]
+
+    if ext == '.feather':
+        from pyarrow import feather
+        table = feather.read_table(nomefile, columns=columns, memory_map=True, use_threads=True)
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(nomefile, columns=columns, memory_map=True, use_threads=True)
+    elif ext == '.npy':
+        from chunked import ChunkedAcc
+        return ChunkedAcc(nomefile).read(columns)
+    else:
+        return pd.read_csv(nomefile, sep=';', usecols=columns)
+
+    # One block per column: no consolidation copy
+    return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+# Memory-mapped recording (.npy structured array, one field per column), accessed block by block
+
+class ChunkedAcc:
+
+    def __init__(self, nomefile, chunk=200000, cache=0):
+
+        self.nomefile = nomefile            # .npy recording
+        self.chunk = chunk                  # 200000 # Samples of every block
+        self.cache = cache                  # 0     # Keeps the jerk next to the recording ('jerk <col> <samp> <file>')
+                                            #         and reuses it, otherwise a temporary file deleted when released
+
+        self.data = np.load(nomefile, mmap_mode='r')
+        self.columns = list(self.data.dtype.names)
+        self.n = self.data.shape[0]
+
+    # Blocks of a column, with `overlap` samples on each side: (first sample of the block, block with overlap, offset)
+
+    def blocks(self, col, overlap=1):
+
+        x = self.data[col]
+        for a in range(0, self.n, self.chunk):
+            b = min(a + self.chunk, self.n)
+            lo = max(a - overlap, 0)
+            hi = min(b + overlap, self.n)
+            yield a, np.asarray(x[lo:hi], dtype=float), a - lo, b - a
+
+    # Gradient of a column (identical to np.gradient on the whole column, one sample of overlap between blocks),
+    # memory-mapped on disk in the folder of the recording (with cache: one file for every column and sample period):
+
+    def gradient(self, col, samp):
+
+        folder, base = os.path.split(self.nomefile)
+
+        if self.cache == 0:
+            out = np.memmap(tempfile.TemporaryFile(dir=folder or None), dtype=np.float64, mode='w+',
+                            shape=(max(self.n, 1),))[:self.n]
+            self.fill_gradient(out, col, samp)
+            return out
+
+        nome = os.path.join(folder, 'jerk ' + col + ' ' + repr(float(samp)) + ' ' + base)
+
+        # Reused while it is newer than the recording:
+        if os.path.exists(nome) and os.path.getmtime(nome) >= os.path.getmtime(self.nomefile):
+            out = np.load(nome, mmap_mode='r')
+            if out.shape[0] == self.n:
+                return out
+
+        out = np.lib.format.open_memmap(nome, mode='w+', dtype=np.float64, shape=(self.n,))
+        self.fill_gradient(out, col, samp)
+        out.flush()
+        return np.load(nome, mmap_mode='r')
+
+    def fill_gradient(self, out, col, samp):
+        for a, blk, off, m in self.blocks(col, overlap=1):
+            out[a:a + m] = np.gradient(blk, samp)[off:off + m]
+
+    # Maximum of an array, block by block:
+
+    def amax(self, arr):
+        return max(float(np.max(arr[a:a + self.chunk])) for a in range(0, arr.shape[0], self.chunk))
+
+    # First index (up to stop) where arr >= thr, block by block (-1 if not found):
+
+    def first_above(self, arr, thr, stop):
+
+        for a in range(0, min(stop, arr.shape[0]), self.chunk):
+            b = min(a + self.chunk, stop)
+            idx = np.flatnonzero(np.asarray(arr[a:b]) >= thr)
+            if idx.size:
+                return a + int(idx[0])
+
+        return -1
+
+    # Only the samples [start, stop) of the requested columns:
+
+    def window(self, columns, start, stop):
+        start = max(start, 0)
+        return pd.DataFrame({c: np.array(self.data[c][start:stop], dtype=float) for c in columns},
+                            index=np.arange(start, start + len(self.data[columns[0]][start:stop])))
+
+    # Whole columns (copy in RAM, only the requested ones):
+
+    def read(self, columns=None):
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({c: np.array(self.data[c], dtype=float) for c in columns})
+
+
+# Saves a DataFrame as a memory-mappable .npy recording:
+
+def save_npy(df, nomefile):
+    rec = np.lib.format.open_memmap(nomefile, mode='w+', dtype=[(c, np.float64) for c in df.columns],
+                                    shape=(df.shape[0],))
+    for c in df.columns:
+        rec[c] = df[c].to_numpy(dtype=float)
+    rec.flush()
+
+
+# Converts a (multi-hour) .csv recording into a .npy recording, chunksize rows at a time. The rows are streamed into
+# a temporary file, the .npy header is written with the number of rows actually parsed:
+
+def convert_csv(nome_csv, nome_npy, chunksize=200000):
+
+    columns = list(pd.read_csv(nome_csv, sep=';', nrows=0).columns)
+    dtype = np.dtype([(c, np.float64) for c in columns])
+
+    i = 0
+
+    with tempfile.TemporaryFile(dir=os.path.dirname(nome_npy) or None) as tmp:
+        for blk in pd.read_csv(nome_csv, sep=';', chunksize=chunksize):
+            rec = np.empty(blk.shape[0], dtype=dtype)
+            for c in columns:
+                rec[c] = blk[c].to_numpy(dtype=float)
+            tmp.write(rec.tobytes())
+            i += blk.shape[0]
+
+        tmp.seek(0)
+        with open(nome_npy, 'wb') as f:
+            np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                     'fortran_order': False, 'shape': (i,)})
+            shutil.copyfileobj(tmp, f, 1 << 20)
+
+    return i
@@ -1,16 +1,50 @@
-import smbus2 as smbus
 import csv
 import time
 from statistics import mean
 from statistics import pstdev
 from datetime import datetime as dt
 import numpy as np
+from online_trigger import OnlineTrigger
+from mpu6050 import mpu6050
+from range_control import RangeControl
+from acc_io import check_format
 
 # Global variables
 
 # Activates the automatic data post-processing:
 trig=1
 
+# Activates the on-device jerk trigger (only the event windows are saved):
+online_trig = 0
+jerk_on = 350           # Jerk trigger threshold [m/s^3]
+pre_tr_on = 20          # Pre-trigger samples of every event
+t_on = 100              # Samples of every event window
+i_max_on = 720000       # Acquisition length with the online trigger (1 h at 200 Hz)
+
+# Activates the live monitor (local HTTP page fed by a shared memory ring buffer, Python 3.8 or newer):
+live = 0
+live_port = 8000
+
+# Recording format ('.csv', '.feather', '.parquet' or '.npy', columnar formats need pyarrow, .npy is also kept on disk
+# and the post-processing reads it memory-mapped, block by block):
+rec_ext = '.csv'
+check_format(rec_ext)
+
+# Saturation check on raw counts and automatic range switching (between blocks of range_block samples):
+auto_range = 0
+range_block = 200
+max_range = 16          # Maximum range [g]
+
+# Run archive compression ('deflate', 'lzma' or 'bzip2') and level:
+zip_method = 'deflate'
+zip_level = 6
+
+# Metrics store shared by every run:
+metrics_file = 'metrics.db'
+
+# Ensemble statistics (mean spectrum, percentiles, RMS distribution) merged run after run:
+ensemble_file = 'ensemble.npz'
+
 # Number of axes and accelerometer:
 n_acc = 4
 axes = 2
@@ -45,117 +79,6 @@ dlpf = 3                # Low-pass filter parameter (refer to datasheets of mpu6
 #5        10  13.8      10   13.4        1
 #6        5   19.0      5    18.6        1
 
-# Accelerometer Class:
-
-class mpu6050:
-
-    GRAVITIY_MS2 = 9.80665
-    address = None
-    bus = None
-
-    ACCEL_SCALE_MODIFIER_2G = 16384.0
-    ACCEL_SCALE_MODIFIER_4G = 8192.0
-
-    ACCEL_RANGE_2G = 0x00
-    ACCEL_RANGE_4G = 0x08
-
-    PWR_MGMT_1 = 0x6B
-    PWR_MGMT_2 = 0x6C
-
-    ACCEL_XOUT0 = 0x3B
-    # ACCEL_YOUT0 = 0x3D
-    ACCEL_ZOUT0 = 0x3F
-
-    ACCEL_CONFIG = 0x1C
-    DLPF_CONFIG = 0x1A
-    
-    # I2C methods:
-
-    def __init__(self, address, bus=1):
-        self.address = address
-        self.bus = smbus.SMBus(bus)
-        self.bus.write_byte_data(self.address, self.PWR_MGMT_1, 0x00)
-
-    # Bit-banging I2C:
-
-    def read_i2c_word(self, register):
-        high = self.bus.read_byte_data(self.address, register)
-        low = self.bus.read_byte_data(self.address, register + 1)
-
-        value = (high << 8) + low
-
-        if value >= 0x8000:
-            return -((65535 - value) + 1)
-        else:
-            return value
-            
-    # Range setting   
-    
-    def set_accel_range(self, accel_range):
-        self.bus.write_byte_data(self.address, self.ACCEL_CONFIG, 0x00)
-        self.bus.write_byte_data(self.address, self.ACCEL_CONFIG, accel_range)
-        
-    # Digital low-pass filter setting
-
-    def set_dlpf(self, dlpf=0):
-        self.bus.write_byte_data(self.address, self.DLPF_CONFIG, 0)
-        self.bus.write_byte_data(self.address, self.DLPF_CONFIG, dlpf)
-        
-    # Range reading
-
-    def read_accel_range(self, raw=False):
-        raw_data = self.bus.read_byte_data(self.address, self.ACCEL_CONFIG)
-
-        if raw is True:
-            return raw_data
-        elif raw is False:
-            if raw_data == self.ACCEL_RANGE_2G:
-                return 2
-            elif raw_data == self.ACCEL_RANGE_4G:
-                return 4
-            elif raw_data == self.ACCEL_RANGE_8G:
-                return 8
-            elif raw_data == self.ACCEL_RANGE_16G:
-                return 16
-            else:
-                return -1
-                
-    # Range reading at +-2g:
-
-    def get_accel_data_2g(self, g=False):
-        x = self.read_i2c_word(self.ACCEL_XOUT0)/ self.ACCEL_SCALE_MODIFIER_2G
-        # y = self.read_i2c_word(self.ACCEL_YOUT0)/ self.ACCEL_SCALE_MODIFIER_2G
-        z = self.read_i2c_word(self.ACCEL_ZOUT0)/ self.ACCEL_SCALE_MODIFIER_2G
-
-        if g is True:
-            #return [x, y, z]
-            return [x, z]
-        elif g is False:
-            x = x * self.GRAVITIY_MS2
-            # y = y * self.GRAVITIY_MS2
-            z = z * self.GRAVITIY_MS2
-            # return [x, y, z]
-            return [x, z]
-            
-    # Range reading +-4g:
-
-    def get_accel_data_4g(self, g=False):
-        x = self.read_i2c_word(self.ACCEL_XOUT0)/ self.ACCEL_SCALE_MODIFIER_4G
-        # y = self.read_i2c_word(self.ACCEL_YOUT0)/ self.ACCEL_SCALE_MODIFIER_4G
-        z = self.read_i2c_word(self.ACCEL_ZOUT0)/ self.ACCEL_SCALE_MODIFIER_4G
-
-        if g is True:
-            #return [x, y, z]
-            return [x, z]
-        elif g is False:
-            x = x * self.GRAVITIY_MS2
-            # y = y * self.GRAVITIY_MS2
-            z = z * self.GRAVITIY_MS2
-            # return [x, y, z]
-            return [x, z]
-
-# --------- End of class mpu6050 -----------
-
 # User request function:
 
 def yes_or_no(domanda):
@@ -378,86 +301,135 @@ else:
 
 ### Data acquisition
 
+from pandas import read_csv as rd
+
+# Import of the calibration values from the calibration .csv:
+cal = rd('/root/calibration4.csv', sep=';')
+
+avg_m = []
+q=1
+
+while q <= tot_ax:
+    avg_m.append(cal.values[0][q])
+    q+=1
+
+cal_1_x = round(avg_m[0], c)
+cal_1_z = round(avg_m[1]-g, c)
+cal_2_x = round(avg_m[2], c)
+cal_2_z = round(avg_m[3]-g, c)
+cal_3_x = round(avg_m[4], c)
+cal_3_z = round(avg_m[5]-g, c)
+cal_4_x = round(avg_m[6], c)
+cal_4_z = round(avg_m[7]-g, c)
+
+offsets = {'Ax_1': cal_1_x, 'Az_1': cal_1_z, 'Ax_2': cal_2_x, 'Az_2': cal_2_z,
+           'Ax_3': cal_3_x, 'Az_3': cal_3_z, 'Ax_4': cal_4_x, 'Az_4': cal_4_z}
+
 domanda2 = str("Do you want to start data acquisition? (Y/n): ")
 
+if live == 1:
+    # Imported only when needed (shared memory: Python 3.8 or newer)
+    from live_monitor import start_monitor
+    ring, monitor = start_monitor(header=["t_1", "Ax_1", "Az_1", "t_2", "Ax_2", "Az_2", "t_3", "Ax_3", "Az_3", "t_4", "Ax_4", "Az_4"],
+                                  samp=samp, ax_princ=ax_princ, port=live_port)
+
 while yes_or_no(domanda2):
 
     data_inizio = dt.now().strftime('%Y-%m-%d-%H-%M-%S')
-    nomefile = 'Acceleration_' + data_inizio + '.csv'
 
     # Cycle parameters:
     i = 0
     i_max = 600
 
-    # Empty numpy array with predefined dimension
-    getdata = np.empty([i_max,(axes*n_acc+n_acc)])
+    if online_trig == 1:
+        i_max = i_max_on
+        evtrig = OnlineTrigger(header=["t_1", "Ax_1", "Az_1", "t_2", "Ax_2", "Az_2", "t_3", "Ax_3", "Az_3", "t_4", "Ax_4", "Az_4"],
+                               samp=samp, t=t_on, jerk_cr=jerk_on, pre_tr=pre_tr_on, ax_princ=ax_princ,
+                               nome='Event_' + data_inizio + '_', decimals=a, offsets=offsets)
+    else:
+        # Empty numpy array with predefined dimension
+        getdata = np.empty([i_max,(axes*n_acc+n_acc)])
+
+    if auto_range == 1:
+        rangectrl = RangeControl([mpu1, mpu2, mpu3, mpu4], block=range_block, max_range=max_range)
 
     # Data acquisition start time:
     print("\n Acquisition started: ", dt.now().strftime('%H-%M-%S'))
 
     start2 = time.time()
 
-    for _ in range(i_max):
+    if online_trig == 1:
+        evtrig.start = start2
 
-        accel_data_1 = mpu1.get_accel_data_2g()
-        t_1 = time.time()
+    # Ctrl-C ends a long online trigger run: the current event and the event list are saved anyway
+    try:
+        for _ in range(i_max):
 
-        accel_data_2 = mpu2.get_accel_data_2g()
-        t_2 = time.time()
+            if auto_range == 1:
+                # Raw counts converted with the range of each sensor, saturation check every range_block samples
+                row = rangectrl.read()
+            else:
+                accel_data_1 = mpu1.get_accel_data_2g()
+                t_1 = time.time()
 
-        accel_data_3 = mpu3.get_accel_data_2g()
-        t_3 = time.time()
+                accel_data_2 = mpu2.get_accel_data_2g()
+                t_2 = time.time()
 
-        accel_data_4 = mpu4.get_accel_data_2g()
-        t_4 = time.time()
+                accel_data_3 = mpu3.get_accel_data_2g()
+                t_3 = time.time()
 
-        getdata[_] = [t_1, accel_data_1[0], accel_data_1[1], 
-                      t_2, accel_data_2[0], accel_data_2[1],
-                      t_3, accel_data_3[0], accel_data_3[1],
-                      t_4, accel_data_4[0], accel_data_4[1]
-                      ]
+                accel_data_4 = mpu4.get_accel_data_2g()
+                t_4 = time.time()
 
-        # Sleeptime to maintain a constant sample rate:
-        time.sleep(samp - (time.time() % samp))
+                row = [t_1, accel_data_1[0], accel_data_1[1], 
+                       t_2, accel_data_2[0], accel_data_2[1],
+                       t_3, accel_data_3[0], accel_data_3[1],
+                       t_4, accel_data_4[0], accel_data_4[1]
+                       ]
+
+            if live == 1:
+                ring.push(row)
+
+            if online_trig == 1:
+                evtrig.push(row)
+            else:
+                getdata[_] = row
+
+            # Sleeptime to maintain a constant sample rate:
+            time.sleep(samp - (time.time() % samp))
+    finally:
+        if online_trig == 1:
+            events = evtrig.close()
 
     # Data acquisition stop:
     print("\n Data acquisition completed: ", time.time() - start2, " s")
     print("\n\n Data acquisition completed, wait until the end of the post-processing operations: ", dt.now().strftime('%H-%M-%S'), "\n")
+
+    # Clipping statistics and range changes:
+    if auto_range == 1:
+        print("\n Saturation check: \n")
+        rangectrl.report()
+
+    # Online trigger: only the event windows were saved
+    if online_trig == 1:
+        if auto_range == 1:
+            with open('Range_' + data_inizio + '.csv', 'w', newline='') as RangeFile:
+                RangeFile.write(rangectrl.to_csv())
+
+        print("\n Events saved: ", len(events), "\n")
+        for ev in events:
+            print(" Trigger iteration: ", ev['trigger'], "\tJerk: ", ev['jerk'], "m/s^3\t", ev['file'])
+        continue
     
     ### Post-processing
     
-    from pandas import read_csv as rd
-    import plotly.graph_objects as go
-    import plotly.io as pio
-    from zipfile import ZipFile
-    import graphic_plot
+    from pandas import DataFrame
+    from post_processing import process_run
     
     # data rounding function:
     getdata = np.around(getdata, decimals=a)
     
-    # saves the array into a .csv
-    np.savetxt(nomefile, getdata, delimiter=";", header="t_1;Ax_1;Az_1;t_2;Ax_2;Az_2;t_3;Ax_3;Az_3;t_4;Ax_4;Az_4", comments='')
-    
-    # Import of the calibration values from the calibration .csv:
-    cal = rd('/root/calibration4.csv', sep=';')
-
-    avg_m = []
-    q=1
-    
-    while q <= tot_ax:
-        avg_m.append(cal.values[0][q])
-        q+=1
-    
-    cal_1_x = round(avg_m[0], c)
-    cal_1_z = round(avg_m[1]-g, c)
-    cal_2_x = round(avg_m[2], c)
-    cal_2_z = round(avg_m[3]-g, c)
-    cal_3_x = round(avg_m[4], c)
-    cal_3_z = round(avg_m[5]-g, c)
-    cal_4_x = round(avg_m[6], c)
-    cal_4_z = round(avg_m[7]-g, c)
-    
-    acc = rd(nomefile, sep=';' )
+    acc = DataFrame(getdata, columns=["t_1", "Ax_1", "Az_1", "t_2", "Ax_2", "Az_2", "t_3", "Ax_3", "Az_3", "t_4", "Ax_4", "Az_4"])
 
     ### Offset cancellation:
     
@@ -478,154 +450,36 @@ while yes_or_no(domanda2):
     acc['Az_3'] = acc['Az_3']-cal_3_z
     acc['Az_4'] = acc['Az_4']-cal_4_z
 
-    # export of the .csv:
-    export_csv = acc.to_csv(nomefile, sep=';')
-    
-    # Jerk of the principal axis:
-    jerk = np.gradient(acc[ax_princ], samp)
-    
-    # Reset of the plot layout
-    pio.templates.default = "none"
-
-    # Plot of the time domain acceleration:
-
-    ax_1 = go.Scatter(
-            x = acc.t_1,
-            y = acc.Ax_1,
-            name = "A1: x",
-            #line = dict(color = 'olive'),
-            opacity = 0.8)
-
-    ax_2 = go.Scatter(
-            x = acc.t_2,
-            y = acc.Ax_2,
-            name = "A2: x",
-            #line = dict(color = 'darkorange'),
-            opacity = 0.8)
-            
-    ax_3 = go.Scatter(
-            x = acc.t_3,
-            y = acc.Ax_3,
-            name = "A3: x",
-            #line = dict(color = 'darkorchid'),
-            opacity = 0.8)
-            
-    ax_4 = go.Scatter(
-            x = acc.t_4,
-            y = acc.Ax_4,
-            name = "A4: x",
-            #line = dict(color = 'lightcoral'),
-            opacity = 0.8)
-            
-    jerk_pr = go.Scatter(
-            x = acc.t_1,
-            y = jerk,
-            customdata = np.arange(0, i_max, 1),
-            name = "jerk z 1",
-            #line = dict(color = 'muted blue'),
-            hovertemplate="Time: %{x:.3f} s<br>" + "Sample: %{customdata:.1f} <br>" + "Jerk: %{y:.2f} m/s^3" + " <extra></extra>",
-            opacity = 0.8)
-
-    az_1 = go.Scatter(
-            x = acc.t_1,
-            y = acc.Az_1,
-            name = "A1: z",
-            #line = dict(color = 'darkviolet'),
-            opacity = 0.8)
-
-    az_2 = go.Scatter(
-            x = acc.t_2,
-            y = acc.Az_2,
-            name = "A2: z",
-            #line = dict(color = 'cyan'),
-            opacity = 0.8)
-
-    az_3 = go.Scatter(
-            x = acc.t_3,
-            y = acc.Az_3,
-            name = "A3: z",
-            #line = dict(color = 'peru'),
-            opacity = 0.8)
-
-    az_4 = go.Scatter(
-            x = acc.t_4,
-            y = acc.Az_4,
-            name = "A4: z",
-            #line = dict(color = 'turquoise'),
-            opacity = 0.8)
-
-    data = [ax_1, ax_2, ax_3, ax_4, jerk_pr, az_1, az_2, az_3, az_4]
-
-    layout = dict(title = 'Display of the acelerations (time domain):')
-    
-    fig = go.Figure(data=data, layout=layout)
-    
-    fig.update_xaxes(title_text="Time [s]")
-    fig.update_yaxes(title_text="Acceleration [m/s^2]; Jerk [m/s^3]")
-    
-    nomegraf = 'Time_Domain_Plot_' + data_inizio + '.html'
-    pio.write_html(fig, file = nomegraf, auto_open = False)
-    
-        # Post-processing check
-     
-    if trig==1:
-    
-        '''
-        Syntax example:
-        
-        plotinstance = plot_acc.PlotAcc(df=dataf, samp=0.005, t=200, jerk_perc=70, pre_tr=20, ax_princ='Ax_1')
-        
-        (dataframe, sampleperiod, number of iteration (time window), trigger trheshold (percentage),
-         pre-trigger iteration, principal trigger axis)
-        
-        It's possible to define other instancies of the class named PlotAcc with differend parameters!
-            
-        Plot of the single axis, syntax example:
-        
-        plotinstance.plot( axis, g=9.81)
-        '''
-        
-        plotrigger = plot_acc.PlotAcc(df=acc, samp=samp, t=100, jerk_perc=350, pre_tr=20, ax_princ=ax_princ)
-        
-        # Transient check:
-        
-        if plotrigger.triggcalc():
-        
-            ### Acc 1
-            plotrigger.plot(axis='Ax_1')
-            plotrigger.plot(axis='Az_1')
-                            
-            ### Acc 2       
-            plotrigger.plot(axis='Ax_2')
-            plotrigger.plot(axis='Az_2')
-                            
-            ### Acc 3       
-            plotrigger.plot(axis='Ax_3')
-            plotrigger.plot(axis='Az_3')
-                            
-            ### Acc 4       
-            plotrigger.plot(axis='Ax_4')
-            plotrigger.plot(axis='Az_4')
-
-
-            # .zip folder creation:
-            nomezip = 'acceldata_' + data_inizio + '.zip'
-            zipfold = ZipFile(nomezip, 'w')
-
-            zipfold.write(nomefile)
-            zipfold.write(nomegraf)
-            zipfold.write('trigger tab.html')
-            zipfold.write('calibration4.csv')
-            
-            for o in range(n_acc):
-                zipfold.write('acceleration tab Ax_' + str(o+1) + '.html')
-                zipfold.write('acceleration tab Az_' + str(o+1) + '.html')
-                zipfold.write('acceleration plot Ax_' + str(o+1) + '.html')
-                zipfold.write('acceleration plot Az_' + str(o+1) + '.html')
-
-            zipfold.close()
+    # Recording, time plot and range changes into the run archive, trigger report, metrics store and ensemble
+    # (same post-processing of the recorder service):
+
+    '''
+    Syntax example:
+
+    plotinstance = plot_acc.PlotAcc(df=dataf, samp=0.005, t=200, jerk_perc=70, pre_tr=20, ax_princ='Ax_1')
+
+    (dataframe, sampleperiod, number of iteration (time window), trigger trheshold (percentage),
+     pre-trigger iteration, principal trigger axis)
+
+    It's possible to define other instancies of the class named PlotAcc with differend parameters!
 
+    Plot of the single axis, syntax example:
+
+    plotinstance.plot( axis, g=9.81)
+    '''
+
+    extra = {}
+    if auto_range == 1:
+        extra['Range_' + data_inizio + '.csv'] = rangectrl.to_csv().encode()
+
+    process_run(acc, data_inizio, samp=samp, ax_princ=ax_princ, t=100, jerk_perc=350, pre_tr=20, trig=trig,
+                rec_ext=rec_ext, cal_file='calibration4.csv', metrics_file=metrics_file, ensemble_file=ensemble_file,
+                zip_method=zip_method, zip_level=zip_level, extra=extra)
 
     print("\n Post-processing operations completed", dt.now().strftime('%H-%M-%S'), "\n")
 
+if live == 1:
+    monitor.terminate()
+    ring.close(unlink=True)
+
 print("\n Data acquisition completed with no errors. \n")
@@ -0,0 +1,167 @@
+import os
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+class EnsembleAcc:
+
+    # Metrics of every run kept for the distributions:
+    METRICS = ('rms', 'peak', 'peak_peak')
+
+    def __init__(self,
+                 nomefile='ensemble.npz',
+                 amp_min=1e-4,
+                 amp_max=1e2,
+                 n_hist=240,
+                 path='C:/'):
+
+        self.nomefile = nomefile            # File of the persistent state
+        self.amp_min = amp_min              # 1e-4  # Amplitude range of the spectrum histograms [m/s^2]
+        self.amp_max = amp_max              # 1e2
+        self.n_hist = n_hist                # 240   # Logarithmic bins of the spectrum histograms
+        self.path = path                    # path of the .html files
+
+        self.edges = np.logspace(np.log10(amp_min), np.log10(amp_max), n_hist + 1)
+        self.axes = {}
+
+        if os.path.exists(nomefile):
+            self.load()
+
+    # Merges the results of a run (list of PlotAcc.plot outputs), the earlier runs are not needed.
+    # Every axis is checked before any update (a rejected run leaves the ensemble untouched):
+
+    def merge(self, results):
+
+        for res in results:
+            asse = res['axis']
+            if asse in self.axes and self.axes[asse]['mean'].shape[0] != np.shape(res['fft'])[0]:
+                print('\n Error: the spectrum of ' + asse + ' has a different resolution (t, samp) from the ensemble! \n')
+                return False
+
+        for res in results:
+            asse = res['axis']
+            fft = np.asarray(res['fft'], dtype=float)
+
+            if asse not in self.axes:
+                self.axes[asse] = {'n': 0,
+                                   'xf': np.asarray(res['xf'], dtype=float),
+                                   'mean': np.zeros(fft.shape[0]),
+                                   'm2': np.zeros(fft.shape[0]),
+                                   'hist': np.zeros([fft.shape[0], self.n_hist + 2], dtype=np.int64),
+                                   'metrics': np.empty([0, len(self.METRICS)])}
+
+            st = self.axes[asse]
+
+            # Welford update of the mean spectrum and of the variance:
+            st['n'] += 1
+            delta = fft - st['mean']
+            st['mean'] += delta / st['n']
+            st['m2'] += delta * (fft - st['mean'])
+
+            # Histogram of every frequency bin (index 0 and n_hist + 1: out of range):
+            idx = np.searchsorted(self.edges, fft, side='right')
+            st['hist'][np.arange(fft.shape[0]), idx] += 1
+
+            st['metrics'] = np.vstack([st['metrics'], [res[m] for m in self.METRICS]])
+
+        self.save()
+        return True
+
+    # Percentiles of the spectrum from the histograms (geometric center of the bin):
+
+    def percentile(self, asse, q):
+
+        st = self.axes[asse]
+        cum = np.cumsum(st['hist'], axis=1)
+        k = np.argmax(cum >= (q / 100) * st['n'], axis=1)
+
+        centers = np.r_[self.amp_min, np.sqrt(self.edges[:-1] * self.edges[1:]), self.amp_max]
+        return centers[k]
+
+    # Ensemble statistics of an axis:
+
+    def stats(self, asse, conf=1.96):
+
+        st = self.axes[asse]
+        n = st['n']
+
+        std = np.sqrt(st['m2'] / (n - 1)) if n > 1 else np.zeros_like(st['mean'])
+        band = conf * std / np.sqrt(n)
+
+        met = st['metrics']
+        dist = {}
+        for c, m in enumerate(self.METRICS):
+            dist[m] = {'mean': float(np.mean(met[:, c])),
+                       'std': float(np.std(met[:, c], ddof=1)) if n > 1 else 0.0,
+                       'p5': float(np.percentile(met[:, c], 5)),
+                       'p50': float(np.percentile(met[:, c], 50)),
+                       'p95': float(np.percentile(met[:, c], 95)),
+                       'values': met[:, c]}
+
+        return {'n': n,
+                'xf': st['xf'],
+                'mean': st['mean'],
+                'std': std,
+                'ci_low': st['mean'] - band,
+                'ci_high': st['mean'] + band,
+                'p5': self.percentile(asse, 5),
+                'p50': self.percentile(asse, 50),
+                'p95': self.percentile(asse, 95),
+                'metrics': dist}
+
+    # Persistent state:
+
+    def save(self):
+
+        state = {'axes': np.array(list(self.axes.keys())), 'edges': self.edges}
+        for asse, st in self.axes.items():
+            for key, val in st.items():
+                state[asse + '/' + key] = val
+
+        np.savez_compressed(self.nomefile, **state)
+
+    # The saved state is never overwritten with different histogram bins (amp_min, amp_max, n_hist):
+
+    def load(self):
+
+        state = np.load(self.nomefile)
+
+        if state['edges'].shape != self.edges.shape or not np.allclose(state['edges'], self.edges):
+            raise ValueError('The histogram bins of ' + self.nomefile + ' (amp_min, amp_max, n_hist) are different: '
+                             'use the same parameters or another ensemble file')
+
+        for asse in state['axes']:
+            asse = str(asse)
+            self.axes[asse] = {key: state[asse + '/' + key] for key in ('xf', 'mean', 'm2', 'hist', 'metrics')}
+            self.axes[asse]['n'] = int(state[asse + '/n'])
+
+    # Plot of the mean spectrum with confidence band and percentiles:
+
+    def plot(self, asse):
+
+        res = self.stats(asse)
+
+        pio.templates.default = "none"
+
+        fig = go.Figure()
+
+        fig.add_trace(go.Scatter(x=res['xf'], y=res['p95'], name="95th percentile", line=dict(color='#7F7F7F', dash='dot')))
+        fig.add_trace(go.Scatter(x=res['xf'], y=res['p5'], name="5th percentile", line=dict(color='#7F7F7F', dash='dot')))
+        fig.add_trace(go.Scatter(x=res['xf'], y=res['ci_high'], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=res['xf'], y=res['ci_low'], name="Confidence band", fill='tonexty',
+                                 line=dict(width=0), fillcolor='rgba(235, 113, 34, 0.3)'))
+        fig.add_trace(go.Scatter(x=res['xf'], y=res['mean'], name="Mean spectrum", line=dict(color='#EB7122'),
+                                 hovertemplate="Freq: %{x:.2f} Hz<br>" + "Amp: %{y:.3f} m/s^2" + " <extra></extra>"))
+
+        fig.update_layout(
+            title="Ensemble spectrum " + asse + " (" + str(res['n']) + " runs)",
+            xaxis_title="Frequency [Hz]",
+            yaxis_title="Amplitude [m/s^2]",
+            height=720, width=1480,
+            legend_orientation="h",
+        )
+
+        pio.write_html(fig, file=self.path + 'ensemble ' + asse + '.html', auto_open=False)
+
+        return res
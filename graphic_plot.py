@@ -1,12 +1,10 @@
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.io as pio
-import scipy.fftpack
-from scipy import signal
 from plotly.subplots import make_subplots
-import random
 import os
+from acc_io import FORMATS, load_acc
+from chunked import ChunkedAcc
 
 
 class PlotAcc:
@@ -19,7 +17,12 @@ class PlotAcc:
                  path='C:/',
                  pre_tr=0,
                  ax_princ='Az_1',
-                 wind=0):
+                 wind=0,
+                 df=None,
+                 archive=None,
+                 show=0,
+                 chunk=200000,
+                 n_plot=200000):
 
         self.ax_princ = ax_princ            # Post-processing trigger axis
         self.samp = samp                    # 0.005 # Sampleperiod: samp=1/samplerate
@@ -29,30 +32,82 @@ class PlotAcc:
         self.pre_tr = pre_tr                # 20    # Defines the number of samples to take into consideration before the trigger iteration
         self.wind = wind                    # 0     # acrivates the exp window function when set to 1
         self.path = path                    # path of the .csv file
+        self.df = df                        # Recording already in memory (extract_csv is skipped)
+        self.archive = archive              # RunArchive: the html files are streamed into the archive
+        self.show = show                    # 0     # Opens the figures in the browser when set to 1
+        self.chunk = chunk                  # 200000 # Samples of every block of a memory-mapped (.npy) recording
+        self.n_plot = n_plot                # 200000 # Maximum points of the full length jerk plot (decimated above)
 
-    # Function that finds the .csv file into path:
+    # Function that finds the recording (.csv, .feather, .parquet or .npy) into path, only the requested columns are loaded:
 
-    def extract_csv(self):
+    def extract_csv(self, columns=None):
 
         dataf = ""
 
+        if isinstance(self.df, ChunkedAcc):
+            return self.df.read([columns] if isinstance(columns, str) else columns)
+
+        if self.df is not None:
+            if isinstance(columns, str):
+                columns = [columns]
+            return self.df if columns is None else self.df[columns]
+
         for nomefile in os.listdir(self.path):
-            if nomefile.startswith('Acceleration'):
+            if nomefile.startswith('Acceleration') and os.path.splitext(nomefile)[1] in FORMATS:
                 address = self.path + nomefile
-                dataf = pd.read_csv(address, sep=';')
+                dataf = load_acc(address, columns)
                 return dataf
 
         if dataf == "":
             print("\n Error! .csv not found in path. \n")
             return False
 
+    # Memory-mapped recording (ChunkedAcc given as df or .npy file into path), None otherwise:
+
+    def source(self):
+
+        if isinstance(self.df, ChunkedAcc):
+            return self.df
+
+        if self.df is None:
+            for nomefile in os.listdir(self.path):
+                if nomefile.startswith('Acceleration') and os.path.splitext(nomefile)[1] in FORMATS:
+                    if nomefile.endswith('.npy'):
+                        return ChunkedAcc(self.path + nomefile, chunk=self.chunk)
+                    break
+
+        return None
+
+    # Samples [start, stop) of the requested columns (only this window is read from a memory-mapped recording):
+
+    def window(self, columns, start, stop):
+
+        src = self.source()
+        if src is not None:
+            return src.window(columns, start, stop)
+
+        return self.extract_csv(columns=columns).iloc[max(start, 0):stop]
+
+    # Saves a figure into path or into the run archive:
+
+    def save_html(self, fig, nome):
+
+        if self.archive is not None:
+            self.archive.add_figure(nome, fig)
+        else:
+            pio.write_html(fig, file=self.path + nome, auto_open=False)
+
     # Function that finds the trigger iteration:
 
     def triggcalc(self):
     
         ax_acc = self.ax_princ
 
-        df = self.extract_csv()
+        src = self.source()
+        if src is not None:
+            return self.triggcalc_chunked(src)
+
+        df = self.extract_csv(columns=ax_acc)
 
         asse = df[ax_acc]
         u = asse.shape[0]
@@ -79,13 +134,33 @@ class PlotAcc:
             jerk_cr = deriv_acc[trigger]
             return {'trigger': trigger, 'deriv_acc': deriv_acc, 'jerk_cr': jerk_cr}
 
+    # Same trigger of triggcalc on a memory-mapped recording: jerk, maximum and threshold block by block
+    # (the jerk is a memory-mapped file next to the recording)
+
+    def triggcalc_chunked(self, src):
+
+        deriv_acc = src.gradient(self.ax_princ, self.samp)
+
+        if self.manual_start == 0:
+            jerk_cr = (self.jerk_perc/100)*np.abs(src.amax(deriv_acc))
+            trigger = src.first_above(deriv_acc, jerk_cr, src.n - self.t)
+
+            if trigger < 0:
+                print('\n Error: no transient was found! \n')
+                return False
+        else:
+            trigger = self.manual_start
+            jerk_cr = deriv_acc[trigger]
+
+        return {'trigger': trigger, 'deriv_acc': deriv_acc, 'jerk_cr': jerk_cr}
+
     # Jerk plot as funcion of time:
 
     def plot_jerk(self, asse):
 
         pio.templates.default = "none"
 
-        df = self.extract_csv()
+        df = self.extract_csv(columns=asse)
 
         acc = df[asse]
         time = np.size(acc)
@@ -120,7 +195,7 @@ class PlotAcc:
         )
 
         fig_j.update_layout(
-            title_text="Jerk of the " + asse " axis (time domain)",
+            title_text="Jerk of the " + asse + " axis (time domain)",
         )
 
         fig_j.update_xaxes(title_text="Time [s]")
@@ -136,218 +211,19 @@ class PlotAcc:
         fig_j.update_yaxes(title_text="Acceleration [m/s^2]", secondary_y=False, range=[-20, 20])
         fig_j.update_yaxes(title_text="jerk [m/s^3]", secondary_y=True, range=[-1.1 * np.abs(np.max(jerk_tot)), 1.1 * np.abs(np.max(jerk_tot))])
 
-        fig_j.show()
+        if self.show:
+            fig_j.show()
         
-        pio.write_html(fig_j, file=self.path + 'jerk ' + asse + 'axis.html', auto_open=False)
+        self.save_html(fig_j, 'jerk ' + asse + 'axis.html')
 
-    # Windowing and plot function:
+    # Windowing and plot function, one axis of the report renderer (same metrics, spectra and figures of the run reports):
 
     def plot(self, asse):
 
-        triggcalc_data = self.triggcalc()
-        df = self.extract_csv()
-        trigger = triggcalc_data['trigger']
-        deriv_acc = triggcalc_data['deriv_acc']
-        jerk_cr = triggcalc_data['jerk_cr']
-        time = np.size(deriv_acc)
-
-        pio.templates.default = "none"
-
-        if asse == self.ax_princ:
-            if self.manual_start == 0:
-                print(" \n Critic Jerk: ", round(jerk_cr), "m/s^3 \n")
-                tab1 = go.Figure(
-                    data=go.Table(
-                        header=dict(values=["Principal axis", "Jerk Trigger Threshold[m/s^3]",
-                                            'Trigger iteration of the principal axis', "Jerk Trigger Value [m/s^3]"]),
-                        cells=dict(values=[self.ax_princ, round(jerk_cr), trigger, round(deriv_acc[trigger])]),
-                        visible=True),
-                    layout=go.Layout(
-                        title='Trigger result:'
-                    )
-                )
-            else:
-                tab1 = go.Figure(
-                    data=go.Table(
-                        header=dict(values=["Principal axis", 'Manual start iteration', "Start Jerk [m/s^3]"]),
-                        cells=dict(values=[self.ax_princ, trigger, round(deriv_acc[trigger])]),
-                        visible=True),
-                    layout=go.Layout(
-                        title='Manual iteration:'
-                    )
-                )
-
-            jerk_tot = go.Scatter(
-                x=np.arange(0, time, self.samp),
-                y=deriv_acc,
-                customdata=np.arange(0, time, 1),
-                line=dict(color='blue'),
-                opacity=0.8,
-                hovertemplate="Time: %{x:.3f} s <br>" + "Sample: %{customdata:.1f} <br>" + "Jerk: %{y:.2f} m/s^3 <br>" + " <extra></extra>",
-            )
-
-            fig1 = go.Figure(data=jerk_tot)
-
-            fig1.update_layout(
-                title="Principal axis jerk (time domain " + self.ax_princ + ")",
-                xaxis_title="Time [s]",
-                yaxis_title="Jerk [m/s^3]",
-                font=dict(
-                    family="Courier New, monospace",
-                    size=18,
-                    color="#7f7f7f"
-                )
-            )
-
-            pio.write_html(fig1, file=self.path + 'principal axis jerk.html', auto_open=False)
-            pio.write_html(tab1, file=self.path + 'trigger tab.html', auto_open=False)
-
-
-            fig1.show()
-            tab1.show()
-
-        rcolor = "#%06x" % random.randint(0, 0xFFFFFF)
-        color2 = '#EB7122'
-        color3 = '#7F7F7F'
+        from report import ReportAcc
 
+        results = ReportAcc(self).render([asse])
 
-        # Calculation of plot variables:
-
-        ris = 1 / (self.t * self.samp)      # Spectral resolution
-        f_max = int((1 / self.samp) / 2)    # Maximum sampling frequency as stated in Nyquist-Shannon Th
-        s = self.t // 2                     # Floor division of the number of samples
-
-        acc = df[asse]
-
-        # Check window option:
-
-        if self.wind:
-            window = signal.windows.exponential(M=self.t, center=0, tau=self.t/5, sym=False)
-            acc_fin = window * acc[trigger - self.pre_tr:trigger + self.t - self.pre_tr]
-        else:
-            acc_fin = acc[trigger - self.pre_tr:trigger + self.t - self.pre_tr]
-
-        jerk_arr = np.gradient(acc_fin, self.samp)
-
-        # Data post-processing
-
-        rms = round(np.sqrt(np.mean(acc_fin ** 2)), 3)  # Root Mean Square
-
-        peak_max = round(np.max(acc_fin), 2)
-        peak_min = round(np.min(acc_fin), 2)
-        peaks = [peak_max, np.abs(peak_min)]
-        peak_plus = round(np.max(peaks), 2)
-        peak_peak = round(peak_max - peak_min, 2)
-
-        tab2 = go.Figure(
-            data=go.Table(
-                header=dict(values=["Axis", "RMS [m/s^2]", "Maximum Peak (absolute value) [m/s^2]", "Peak to Peak [m/s^2]",
-                                    'Spectral resolution [Hz]']),
-                cells=dict(values=[asse, rms, peak_plus, peak_peak, round(ris, 2)]),
-                visible=True, ),
-            layout=go.Layout(
-                title='Values:'
-            )
-        )
-
-        tab2.show()
-
-        pio.write_html(tab2, file=self.path + 'acceleration tab ' + asse + '.html', auto_open=False)
-
-        fig = make_subplots(rows=3, cols=1,
-                            subplot_titles=("Time domain " + asse, "Frequency domain " + asse, "Jerk " + asse),
-                            )
-
-        freq = go.Scatter(
-            x=np.arange(0, self.t * self.samp, self.samp),
-            y=acc_fin,
-            name="Acc. " + asse,
-            line=dict(color=rcolor),
-            opacity=0.8,
-            hovertemplate="Time: %{x:.3f} s<br>" + "Acc: %{y:.2f} m/s^2" + " <extra></extra>",
-        )
-
-        # Fourier Transform:
-
-        xf = np.arange(ris, f_max, ris)
-
-        fft = 2 / self.t * np.abs(scipy.fftpack.fft(acc_fin)[1:s])
-        yf = fft
-
-        trasf = go.Scatter(
-            x=xf,
-            y=yf,
-            name="FFT " + asse,
-            mode='markers',
-            marker=dict(color=color2),
-            opacity=0.8,
-            hovertemplate="Freq: %{x:.2f} Hz<br>" + "Amp: %{y:.2f} m/s^2" + " <extra></extra>",
-        )
-
-        fig.add_bar(x=xf, y=yf, showlegend=False, row=2, col=1, hoverinfo='skip',
-                    marker=dict(
-                        color=color2,
-                        opacity=0.5)
-                    )
-
-        jerk = go.Scatter(
-            x=np.arange(0, self.t * self.samp, self.samp),
-            y=jerk_arr,
-            name="Jerk " + asse,
-            line=dict(color=color3),
-            opacity=0.8,
-            hovertemplate="Time: %{x:.3f} s<br>" + "Jerk: %{y:.2f} m/s^3" + " <extra></extra>",
-        )
-
-        fig.append_trace(freq, 1, 1)
-        fig.append_trace(trasf, 2, 1)
-        fig.append_trace(jerk, 3, 1)
-
-        # Time domain layout update:
-
-        fig.update_xaxes(row=1, col=1, showgrid=False, gridwidth=1, gridcolor='black', zerolinecolor='black', zerolinewidth=0.1, zeroline=False,
-                         title_text="Time [s]", ticks="outside", tickwidth=1, tickcolor='black', ticklen=5, mirror=True, showline=True
-                         )
-
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='black', zerolinecolor='black', zeroline=True,
-                         title_text="Acceleration [m/s^2]", ticks="outside", tickwidth=1, tickcolor='black',
-                         row=1, col=1, ticklen=5, zerolinewidth=0.1, mirror=True, showline=True
-                         )
-
-        # Frequency domain layout update:
-
-        fig.update_xaxes(showgrid=False, gridwidth=1, gridcolor='black', zerolinecolor='black', zeroline=False, row=2, col=1,
-                         mirror=True, ticks='outside', showline=True, zerolinewidth=0.1,
-                         title_text="Frequency [Hz]", tickwidth=1, tickcolor='black', ticklen=5,
-                         range=[-1, f_max]
-                         )
-
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='black', zerolinecolor='black', zeroline=True, row=2, col=1,
-                         mirror=True, ticks='outside', showline=True, zerolinewidth=0.1,
-                         title_text="Amplitude [m/s^2]", tickwidth=1, tickcolor='black', ticklen=5,
-                         range=[0, np.max(yf + yf / 10)]
-                         )
-
-        # Jerk plot layout update:
-
-        fig.update_xaxes(showgrid=False, gridwidth=1, gridcolor='black', zerolinecolor='black', zeroline=False, row=3, col=1,
-                         mirror=True, ticks='outside', showline=True, zerolinewidth=0.1,
-                         title_text="Time [s]", tickwidth=1, tickcolor='black', ticklen=5
-                         )
-
-        fig.update_yaxes(showgrid=False, gridwidth=1, gridcolor='black', zerolinecolor='black', zeroline=True, row=3, col=1,
-                         mirror=True, ticks='outside', showline=True, zerolinewidth=0.1,
-                         title_text="Jerk [m/s^3]", tickwidth=1, tickcolor='black', ticklen=5
-                         )
-
-        # General layout update
-
-        fig.update_layout(height=1020, width=1480,
-                          bargap=0.75, barmode='overlay',
-                          legend_orientation="h",
-                          )
-
-        # Save plots:
-
-        pio.write_html(fig, file=self.path + 'acceleration plot ' + asse + '.html', auto_open=False)
-        
\ No newline at end of file
+        if results is False:
+            return False
+        return results[0]
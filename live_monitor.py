@@ -0,0 +1,194 @@
+import json
+import os
+import time
+import numpy as np
+from multiprocessing import Process
+from multiprocessing import shared_memory
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Shared memory ring buffer (one writer: the acquisition loop, any number of readers):
+
+class ShmRing:
+
+    def __init__(self, n_col, n_rows=2000, name=None, create=True):
+
+        self.n_col = n_col                  # Columns of every sample
+        self.n_rows = n_rows                # 2000  # Samples kept in the ring (10 s at 200 Hz)
+
+        size = 8 + 8 * n_rows * n_col
+
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size, name=name)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.name = self.shm.name
+
+        # Write counter (total number of samples pushed) followed by the data:
+        self.count = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.data = np.ndarray((n_rows, n_col), dtype=np.float64, buffer=self.shm.buf, offset=8)
+
+        if create:
+            self.count[0] = 0
+
+    # Writer side, no locks: the row is written before the counter is advanced
+
+    def push(self, row):
+        c = self.count[0]
+        self.data[c % self.n_rows] = row
+        self.count[0] = c + 1
+
+    # Reader side: copy of the last k samples, the rows overwritten during the copy are dropped
+
+    def last(self, k):
+        c1 = int(self.count[0])
+        k = min(k, c1, self.n_rows)
+        idx = np.arange(c1 - k, c1)
+        rows = self.data[idx % self.n_rows]
+        c2 = int(self.count[0])
+
+        # Row c2 (slot of idx == c2 - n_rows) may be half written by the writer:
+        valid = idx > c2 - self.n_rows
+        return rows[valid], c1
+
+    def close(self, unlink=False):
+        del self.count, self.data
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+# Snapshot of the live values (computed once per refresh, shared by every viewer):
+
+class LiveState:
+
+    def __init__(self, ring, header, samp=0.005, window=2, dec=4, ax_princ='Az_2', refresh=0.2):
+
+        self.ring = ring
+        self.header = header                # Column names of the acquired rows
+        self.samp = samp                    # 0.005 # Sampleperiod: samp=1/samplerate
+        self.k = int(window / samp)         # Samples of the displayed window (window in seconds)
+        self.dec = dec                      # 4     # Decimation of the displayed traces
+        self.ax_princ = ax_princ            # Jerk axis
+        self.refresh = refresh              # 0.2   # Minimum time between two snapshots [s]
+
+        self.acc_col = [n for n, h in enumerate(header) if not h.startswith('t_')]
+        self.t_col = header.index('t_1')
+        self.princ_col = header.index(ax_princ)
+
+        self.t_snap = 0
+        self.snap = b'{}'
+
+    def snapshot(self):
+
+        if time.time() - self.t_snap < self.refresh:
+            return self.snap
+
+        rows, count = self.ring.last(self.k)
+
+        if rows.shape[0] < 3:
+            return b'{"count": 0}'
+
+        acc = rows[:, self.acc_col]
+        jerk = np.gradient(rows[:, self.princ_col], self.samp)
+
+        snap = {
+            'count': count,
+            'time': np.round(rows[::self.dec, self.t_col] - rows[-1, self.t_col], 3).tolist(),
+            'traces': {self.header[c]: np.round(rows[::self.dec, c], 3).tolist() for c in self.acc_col},
+            'rms': dict(zip([self.header[c] for c in self.acc_col], np.round(np.sqrt(np.mean(acc ** 2, axis=0)), 3).tolist())),
+            'jerk': round(float(jerk[-1]), 2),
+            'jerk_max': round(float(np.max(np.abs(jerk))), 2),
+        }
+
+        self.snap = json.dumps(snap).encode()
+        self.t_snap = time.time()
+        return self.snap
+
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Live acceleration</title></head>
+<body style="font-family: Courier New, monospace">
+<h3>Live acceleration</h3>
+<pre id="val"></pre>
+<canvas id="plot" width="1200" height="400"></canvas>
+<script>
+async function update() {
+    try {
+        const d = await (await fetch('/data')).json();
+        if (d.traces) {
+            let txt = 'Samples: ' + d.count + '   Jerk: ' + d.jerk + ' m/s^3   Max jerk: ' + d.jerk_max + ' m/s^3\\n';
+            for (const k in d.rms) txt += 'RMS ' + k + ': ' + d.rms[k] + ' m/s^2   ';
+            document.getElementById('val').textContent = txt;
+            const c = document.getElementById('plot').getContext('2d');
+            c.clearRect(0, 0, 1200, 400);
+            const n = d.time.length;
+            for (const k in d.traces) {
+                c.beginPath();
+                d.traces[k].forEach((y, i) => c.lineTo(i * 1200 / n, 200 - y * 10));
+                c.stroke();
+            }
+        }
+    } catch (e) {}
+    setTimeout(update, 200);
+}
+update();
+</script>
+</body></html>
+"""
+
+
+# HTTP server (run in a separate, lower priority process):
+
+def serve(shm_name, n_col, n_rows, header, samp=0.005, ax_princ='Az_2', host='127.0.0.1', port=8000, nice=10):
+
+    os.nice(nice)
+
+    ring = ShmRing(n_col=n_col, n_rows=n_rows, name=shm_name, create=False)
+    state = LiveState(ring, header, samp=samp, ax_princ=ax_princ)
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == '/data':
+                body = state.snapshot()
+                ctype = 'application/json'
+            elif self.path == '/':
+                body = PAGE
+                ctype = 'text/html'
+            else:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', ctype)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+
+    try:
+        httpd.serve_forever()
+    finally:
+        ring.close()
+
+
+# Starts the monitor process and returns the ring to be filled by the acquisition loop:
+
+def start_monitor(header, n_rows=2000, samp=0.005, ax_princ='Az_2', host='127.0.0.1', port=8000):
+
+    ring = ShmRing(n_col=len(header), n_rows=n_rows)
+
+    proc = Process(target=serve, args=(ring.name, len(header), n_rows, header),
+                   kwargs=dict(samp=samp, ax_princ=ax_princ, host=host, port=port), daemon=True)
+    proc.start()
+
+    print("\n Live monitor: http://" + host + ":" + str(port) + "\n")
+
+    return ring, proc
@@ -0,0 +1,114 @@
+import sqlite3
+
+
+class MetricsDB:
+
+    # Queryable metrics and comparison operators:
+    METRICS = ('rms', 'peak', 'peak_peak', 'ris')
+    OPS = ('<', '<=', '>', '>=', '=', '!=')
+
+    def __init__(self, nomefile='metrics.db'):
+
+        self.nomefile = nomefile            # SQLite file shared by every run
+
+        self.con = sqlite3.connect(nomefile)
+        self.con.execute('PRAGMA journal_mode=WAL')
+        self.con.execute('PRAGMA foreign_keys=ON')
+
+        self.con.executescript('''
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id      INTEGER PRIMARY KEY,
+                date        TEXT UNIQUE,
+                samp        REAL,
+                t           INTEGER,
+                jerk_perc   REAL,
+                pre_tr      INTEGER,
+                ax_princ    TEXT,
+                trigger     INTEGER,
+                jerk_cr     REAL,
+                jerk_trig   REAL
+            );
+            CREATE TABLE IF NOT EXISTS metrics (
+                run_id      INTEGER REFERENCES runs(run_id) ON DELETE CASCADE,
+                axis        TEXT,
+                rms         REAL,
+                peak        REAL,
+                peak_peak   REAL,
+                ris         REAL,
+                PRIMARY KEY (run_id, axis)
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                run_id      INTEGER REFERENCES runs(run_id) ON DELETE CASCADE,
+                kind        TEXT,
+                file        TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_rms ON metrics(axis, rms);
+            CREATE INDEX IF NOT EXISTS idx_peak ON metrics(axis, peak);
+            CREATE INDEX IF NOT EXISTS idx_peak_peak ON metrics(axis, peak_peak);
+            CREATE INDEX IF NOT EXISTS idx_files ON files(run_id);
+        ''')
+
+    # Saves a run: parameters, trigger result, metrics of every axis and file references (single transaction):
+
+    def add_run(self, date, plotinstance, results, files=()):
+
+        trig = [res for res in results if 'trigger' in res]
+        trig = trig[0] if trig else {}
+
+        with self.con:
+            cur = self.con.execute(
+                'INSERT OR REPLACE INTO runs (date, samp, t, jerk_perc, pre_tr, ax_princ, trigger, jerk_cr, jerk_trig) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (date, plotinstance.samp, plotinstance.t, plotinstance.jerk_perc, plotinstance.pre_tr,
+                 plotinstance.ax_princ, trig.get('trigger'), trig.get('jerk_cr'), trig.get('jerk_trig')))
+
+            run_id = cur.lastrowid
+
+            self.con.executemany(
+                'INSERT INTO metrics (run_id, axis, rms, peak, peak_peak, ris) VALUES (?, ?, ?, ?, ?, ?)',
+                [(run_id, res['axis'], res['rms'], res['peak'], res['peak_peak'], res['ris']) for res in results])
+
+            self.con.executemany(
+                'INSERT INTO files (run_id, kind, file) VALUES (?, ?, ?)',
+                [(run_id, kind, file) for kind, file in files])
+
+        return run_id
+
+    # Runs where the metric of the axis satisfies the condition, e.g. query('Az_2', 'rms', '>', 1.5):
+
+    def query(self, axis, metric='rms', op='>', value=0):
+
+        if metric not in self.METRICS or op not in self.OPS:
+            print('\n Error! Invalid metric or operator. \n')
+            return False
+
+        cur = self.con.execute(
+            'SELECT runs.run_id, runs.date, metrics.axis, metrics.' + metric + ' FROM metrics '
+            'JOIN runs ON runs.run_id = metrics.run_id '
+            'WHERE metrics.axis = ? AND metrics.' + metric + ' ' + op + ' ? '
+            'ORDER BY runs.date',
+            (axis, value))
+
+        return cur.fetchall()
+
+    # Every metric and file of a run:
+
+    def run(self, run_id):
+
+        cur = self.con.execute('SELECT * FROM runs WHERE run_id = ?', (run_id,))
+        names = [d[0] for d in cur.description]
+        row = cur.fetchone()
+
+        if row is None:
+            return False
+
+        res = dict(zip(names, row))
+        res['metrics'] = self.con.execute(
+            'SELECT axis, rms, peak, peak_peak, ris FROM metrics WHERE run_id = ? ORDER BY axis', (run_id,)).fetchall()
+        res['files'] = self.con.execute(
+            'SELECT kind, file FROM files WHERE run_id = ?', (run_id,)).fetchall()
+
+        return res
+
+    def close(self):
+        self.con.close()
@@ -0,0 +1,180 @@
+import smbus2 as smbus
+
+
+# Accelerometer Class:
+
+class mpu6050:
+
+    GRAVITIY_MS2 = 9.80665
+    address = None
+    bus = None
+
+    ACCEL_SCALE_MODIFIER_2G = 16384.0
+    ACCEL_SCALE_MODIFIER_4G = 8192.0
+    ACCEL_SCALE_MODIFIER_8G = 4096.0
+    ACCEL_SCALE_MODIFIER_16G = 2048.0
+
+    ACCEL_RANGE_2G = 0x00
+    ACCEL_RANGE_4G = 0x08
+    ACCEL_RANGE_8G = 0x10
+    ACCEL_RANGE_16G = 0x18
+
+    # Scale modifier of the range set with set_accel_range:
+    scale = ACCEL_SCALE_MODIFIER_2G
+
+    PWR_MGMT_1 = 0x6B
+    PWR_MGMT_2 = 0x6C
+
+    ACCEL_XOUT0 = 0x3B
+    # ACCEL_YOUT0 = 0x3D
+    ACCEL_ZOUT0 = 0x3F
+
+    ACCEL_CONFIG = 0x1C
+    DLPF_CONFIG = 0x1A
+    
+    # I2C methods:
+
+    def __init__(self, address, bus=1, mux=None, channel=0):
+        self.address = address
+        self.mux = mux                      # I2C multiplexer (tca9548a) of the sensor, None if directly on the bus
+        self.channel = channel              # Multiplexer channel
+        if mux is not None:
+            self.bus = mux.bus
+        elif isinstance(bus, int):
+            self.bus = smbus.SMBus(bus)
+        else:
+            self.bus = bus
+        self.select()
+        self.bus.write_byte_data(self.address, self.PWR_MGMT_1, 0x00)
+
+    # Multiplexer channel selection (no transaction if the channel is already selected):
+
+    def select(self):
+        if self.mux is not None:
+            self.mux.select(self.channel)
+
+    # Bit-banging I2C:
+
+    def read_i2c_word(self, register):
+        self.select()
+        high = self.bus.read_byte_data(self.address, register)
+        low = self.bus.read_byte_data(self.address, register + 1)
+
+        value = (high << 8) + low
+
+        if value >= 0x8000:
+            return -((65535 - value) + 1)
+        else:
+            return value
+            
+    # Range setting   
+    
+    def set_accel_range(self, accel_range):
+        self.select()
+        self.bus.write_byte_data(self.address, self.ACCEL_CONFIG, 0x00)
+        self.bus.write_byte_data(self.address, self.ACCEL_CONFIG, accel_range)
+        self.scale = {self.ACCEL_RANGE_2G: self.ACCEL_SCALE_MODIFIER_2G,
+                      self.ACCEL_RANGE_4G: self.ACCEL_SCALE_MODIFIER_4G,
+                      self.ACCEL_RANGE_8G: self.ACCEL_SCALE_MODIFIER_8G,
+                      self.ACCEL_RANGE_16G: self.ACCEL_SCALE_MODIFIER_16G}[accel_range]
+        
+    # Digital low-pass filter setting
+
+    def set_dlpf(self, dlpf=0):
+        self.select()
+        self.bus.write_byte_data(self.address, self.DLPF_CONFIG, 0)
+        self.bus.write_byte_data(self.address, self.DLPF_CONFIG, dlpf)
+        
+    # Range reading
+
+    def read_accel_range(self, raw=False):
+        self.select()
+        raw_data = self.bus.read_byte_data(self.address, self.ACCEL_CONFIG)
+
+        if raw is True:
+            return raw_data
+        elif raw is False:
+            if raw_data == self.ACCEL_RANGE_2G:
+                return 2
+            elif raw_data == self.ACCEL_RANGE_4G:
+                return 4
+            elif raw_data == self.ACCEL_RANGE_8G:
+                return 8
+            elif raw_data == self.ACCEL_RANGE_16G:
+                return 16
+            else:
+                return -1
+                
+    # Raw counts (saturation check), to be divided by self.scale:
+
+    def get_accel_raw(self):
+        return [self.read_i2c_word(self.ACCEL_XOUT0), self.read_i2c_word(self.ACCEL_ZOUT0)]
+
+    # Range reading at +-2g:
+
+    def get_accel_data_2g(self, g=False):
+        x = self.read_i2c_word(self.ACCEL_XOUT0)/ self.ACCEL_SCALE_MODIFIER_2G
+        # y = self.read_i2c_word(self.ACCEL_YOUT0)/ self.ACCEL_SCALE_MODIFIER_2G
+        z = self.read_i2c_word(self.ACCEL_ZOUT0)/ self.ACCEL_SCALE_MODIFIER_2G
+
+        if g is True:
+            #return [x, y, z]
+            return [x, z]
+        elif g is False:
+            x = x * self.GRAVITIY_MS2
+            # y = y * self.GRAVITIY_MS2
+            z = z * self.GRAVITIY_MS2
+            # return [x, y, z]
+            return [x, z]
+            
+    # Range reading +-4g:
+
+    def get_accel_data_4g(self, g=False):
+        x = self.read_i2c_word(self.ACCEL_XOUT0)/ self.ACCEL_SCALE_MODIFIER_4G
+        # y = self.read_i2c_word(self.ACCEL_YOUT0)/ self.ACCEL_SCALE_MODIFIER_4G
+        z = self.read_i2c_word(self.ACCEL_ZOUT0)/ self.ACCEL_SCALE_MODIFIER_4G
+
+        if g is True:
+            #return [x, y, z]
+            return [x, z]
+        elif g is False:
+            x = x * self.GRAVITIY_MS2
+            # y = y * self.GRAVITIY_MS2
+            z = z * self.GRAVITIY_MS2
+            # return [x, y, z]
+            return [x, z]
+
+# --------- End of class mpu6050 -----------
+
+# I2C multiplexer Class (TCA9548A, 8 channels):
+
+class tca9548a:
+
+    def __init__(self, address=0x70, bus=1):
+        self.address = address
+        if isinstance(bus, int):
+            self.bus = smbus.SMBus(bus)
+        else:
+            self.bus = bus
+        self.channel = None                 # Selected channel
+        self.switches = 0                   # Number of channel switch transactions
+        self.siblings = []                  # Other multiplexers on the same bus (closed before a selection)
+        self.bus.write_byte(self.address, 0x00)
+
+    def select(self, channel):
+        if channel != self.channel:
+            for mux in self.siblings:
+                mux.off()
+            self.bus.write_byte(self.address, 1 << channel)
+            self.channel = channel
+            self.switches += 1
+
+    # Closes every channel (needed when another multiplexer on the same bus is selected):
+
+    def off(self):
+        if self.channel is not None:
+            self.bus.write_byte(self.address, 0x00)
+            self.channel = None
+            self.switches += 1
+
+# --------- End of class tca9548a -----------
@@ -0,0 +1,168 @@
+import time
+import numpy as np
+
+
+# Simulated I2C bus: TCA9548A multiplexers and MPU-6050 sensors (same calls of smbus2.SMBus)
+
+class SimBus:
+
+    def __init__(self, latency=0.0, seed=0):
+
+        self.latency = latency              # 0.0   # Duration of every transaction [s]
+        self.rng = np.random.default_rng(seed)
+        self.mux = {}                       # Multiplexer address: selected channel mask
+        self.devices = {}                   # (multiplexer address, channel, sensor address): registers
+        self.transactions = 0
+
+    def add_mux(self, address=0x70):
+        self.mux[address] = 0
+
+    def add_sensor(self, address, mux=None, channel=0, value=0.0):
+        self.devices[(mux, channel if mux is not None else None, address)] = {'value': value, 'reg': {}}
+
+    def transaction(self):
+        self.transactions += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    # Sensor visible at the address with the current channels (error if none or more than one):
+
+    def device(self, address):
+        found = []
+        for (mux, channel, addr), dev in self.devices.items():
+            if addr != address:
+                continue
+            if mux is None or self.mux[mux] & (1 << channel):
+                found.append(dev)
+        if len(found) != 1:
+            raise OSError('I2C address ' + hex(address) + ': ' + str(len(found)) + ' devices visible')
+        return found[0]
+
+    def write_byte(self, address, value):
+        self.transaction()
+        self.mux[address] = value
+
+    def write_byte_data(self, address, register, value):
+        self.transaction()
+        self.device(address)['reg'][register] = value
+
+    def read_byte_data(self, address, register):
+        self.transaction()
+        dev = self.device(address)
+        if register not in (0x3B, 0x3C, 0x3D, 0x3E, 0x3F, 0x40):
+            return dev['reg'].get(register, 0)
+
+        # Acceleration registers: constant value plus noise, in raw counts of the range set into ACCEL_CONFIG
+        if register % 2 == 1:
+            scale = 16384 >> (dev['reg'].get(0x1C, 0) >> 3)
+            dev['raw'] = int(np.clip((dev['value'] / 9.80665 + self.rng.normal(0, 0.01)) * scale, -32768, 32767)) & 0xFFFF
+            return dev['raw'] >> 8
+        return dev['raw'] & 0xFF
+
+
+# Read scheduler: sensors are batched by multiplexer channel and the channels are visited in serpentine order,
+# so the last channel of a row is the first of the next one
+
+class MuxScheduler:
+
+    def __init__(self, sensors):
+
+        self.sensors = sensors              # mpu6050 instances (with or without multiplexer)
+
+        # Busses numbered in order of first appearance (stable order, not memory addresses):
+        bus_rank = {}
+        for sensor in sensors:
+            bus_rank.setdefault(id(sensor.bus), len(bus_rank))
+
+        groups = {}
+        for n, sensor in enumerate(sensors):
+            mux = getattr(sensor, 'mux', None)
+            key = (bus_rank[id(sensor.bus)], mux.address if mux is not None else -1,
+                   sensor.channel if mux is not None else -1)
+            groups.setdefault(key, []).append(n)
+
+        # Direct sensors first (no switch), then by bus, multiplexer address and channel:
+        self.groups = [groups[key] for key in sorted(groups)]
+        self.direct = [g for g in self.groups if getattr(sensors[g[0]], 'mux', None) is None]
+        self.muxed = [g for g in self.groups if getattr(sensors[g[0]], 'mux', None) is not None]
+
+        self.rows = 0
+
+    # Reads every sensor, the row keeps the order of self.sensors: [t_1, x_1, z_1, t_2, x_2, z_2, ...]
+
+    def read_row(self):
+
+        row = [0.0] * (3 * len(self.sensors))
+
+        muxed = self.muxed if self.rows % 2 == 0 else self.muxed[::-1]
+        self.rows += 1
+
+        for group in self.direct + muxed:
+            for n in group:
+                accel_data = self.sensors[n].get_accel_data_2g()
+                row[3 * n:3 * n + 3] = [time.time(), accel_data[0], accel_data[1]]
+
+        return row
+
+    # Cost of a row: time and channel switch transactions (averaged over n_rows):
+
+    def measure(self, n_rows=200):
+
+        muxes = {id(s.mux): s.mux for s in self.sensors if getattr(s, 'mux', None) is not None}
+        sw0 = sum(m.switches for m in muxes.values())
+
+        start = time.perf_counter()
+        for _ in range(n_rows):
+            self.read_row()
+        elapsed = time.perf_counter() - start
+
+        switches = sum(m.switches for m in muxes.values()) - sw0
+
+        res = {'sensors': len(self.sensors), 'row_time': elapsed / n_rows, 'switches': switches / n_rows,
+               'max_rate': n_rows / elapsed}
+
+        print("\n Sensors: ", len(self.sensors), "\tRow time: ", round(res['row_time'] * 1000, 3), "ms",
+              "\tSwitches per row: ", round(res['switches'], 2), "\tMaximum sample rate: ", round(res['max_rate']), "Hz")
+
+        return res
+
+
+# Sensor array from a configuration list of (bus, multiplexer address or None, channel, sensor address).
+# A sensor directly on a bus answers also while a multiplexer channel is open: its address cannot be used behind
+# the multiplexers of the same bus (both sensors would answer every read)
+
+def build_array(config, buses=None):
+
+    from mpu6050 import mpu6050, tca9548a
+
+    direct = {(bus, address) for bus, mux_addr, channel, address in config if mux_addr is None}
+    for bus, mux_addr, channel, address in config:
+        if mux_addr is not None and (bus, address) in direct:
+            raise ValueError('I2C address ' + hex(address) + ' on bus ' + str(bus) + ' used both directly and behind '
+                             'the multiplexer ' + hex(mux_addr) + ': move the direct sensor behind a multiplexer '
+                             'or change its address')
+
+    buses = buses if buses is not None else {}
+    muxes = {}
+    sensors = []
+
+    for bus, mux_addr, channel, address in config:
+        if bus not in buses:
+            import smbus2 as smbus
+            buses[bus] = smbus.SMBus(bus)
+
+        if mux_addr is None:
+            sensors.append(mpu6050(address, bus=buses[bus]))
+        else:
+            if (bus, mux_addr) not in muxes:
+                mux = tca9548a(mux_addr, bus=buses[bus])
+
+                # Multiplexers on the same bus close each other before a selection:
+                for (b, _), other in muxes.items():
+                    if b == bus:
+                        other.siblings.append(mux)
+                        mux.siblings.append(other)
+                muxes[(bus, mux_addr)] = mux
+            sensors.append(mpu6050(address, mux=muxes[(bus, mux_addr)], channel=channel))
+
+    return MuxScheduler(sensors)
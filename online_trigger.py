@@ -0,0 +1,109 @@
+import csv
+import numpy as np
+
+
+class OnlineTrigger:
+
+    def __init__(self,
+                 header,
+                 samp=0.005,
+                 t=100,
+                 jerk_cr=350,
+                 pre_tr=20,
+                 ax_princ='Az_2',
+                 nome='Event_',
+                 decimals=5,
+                 offsets=None,
+                 start=0.0):
+
+        self.header = header                # Column names of the acquired rows
+        self.samp = samp                    # 0.005 # Sampleperiod: samp=1/samplerate
+        self.t = t                          # 100   # Number of samples of every event window
+        self.jerk_cr = jerk_cr              # 350   # Jerk trigger threshold [m/s^3]
+        self.pre_tr = pre_tr                # 20    # Number of samples to save before the trigger iteration
+        self.ax_princ = ax_princ            # Trigger axis
+        self.nome = nome                    # Prefix of the event files
+        self.decimals = decimals            # Rounding of the saved values
+        self.start = start                  # Acquisition start time, subtracted from the time columns when saved
+        self.offsets = offsets or {}        # Calibration offsets {axis: value}, subtracted when saved (the jerk
+                                            # trigger is not affected: the event files match the Acceleration_ files)
+
+        self.col = header.index(ax_princ)
+
+        # Pre-trigger ring buffer: pre_tr samples before the trigger, the trigger sample and the current one
+        self.ring_len = pre_tr + 2
+        self.ring = np.empty([self.ring_len, len(header)])
+
+        self.event = np.empty([t, len(header)])
+
+        self.i = 0              # Index of the next sample
+        self.fill = -1          # Samples already written into self.event, -1 when waiting for a trigger
+        self.trigger = None
+        self.jerk = None
+        self.events = []
+
+    # Adds a sample, tracks the principal axis jerk and saves the event windows:
+
+    def push(self, row):
+
+        i = self.i
+        self.ring[i % self.ring_len] = row
+        self.i += 1
+
+        if self.fill >= 0:
+            self.event[self.fill] = row
+            self.fill += 1
+            if self.fill == self.t:
+                self.save()
+            return
+
+        # Central difference (as np.gradient) of the previous sample:
+        if i < 2 or i - 1 < self.pre_tr:
+            return
+
+        jerk = (self.ring[i % self.ring_len, self.col] - self.ring[(i - 2) % self.ring_len, self.col]) / (2 * self.samp)
+
+        if jerk >= self.jerk_cr:
+            self.trigger = i - 1
+            self.jerk = jerk
+
+            # Copy of the pre-trigger samples, the trigger sample and the current one:
+            start = i - 1 - self.pre_tr
+            n = min(self.pre_tr + 2, self.t)
+            for k in range(n):
+                self.event[k] = self.ring[(start + k) % self.ring_len]
+            self.fill = n
+
+            if self.fill == self.t:
+                self.save()
+
+    # Event window export:
+
+    def save(self):
+
+        nomefile = self.nome + str(self.trigger) + '.csv'
+
+        # Time and offset cancellation (as in data_aq.py):
+        offset = np.array([self.start if h.startswith('t_') else self.offsets.get(h, 0.0) for h in self.header])
+
+        np.savetxt(nomefile, np.around(self.event[:self.fill] - offset, decimals=self.decimals), delimiter=";",
+                   header=";".join(self.header), comments='')
+
+        self.events.append({'trigger': self.trigger, 'jerk': round(float(self.jerk), 2), 'file': nomefile})
+        self.fill = -1
+
+    # Saves the last (incomplete) event and the event list:
+
+    def close(self):
+
+        if self.fill > 0:
+            self.save()
+
+        with open(self.nome + 'list.csv', 'w', newline='') as EventFile:
+            writer = csv.writer(EventFile, delimiter=';')
+            writer.writerow(["Trigger iteration", "Jerk Trigger Value [m/s^3]", "File"])
+
+            for ev in self.events:
+                writer.writerow([ev['trigger'], ev['jerk'], ev['file']])
+
+        return self.events
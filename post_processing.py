@@ -0,0 +1,109 @@
+import os
+import numpy as np
+
+
+# Time domain plot of every accelerometer with the jerk of the principal axis:
+
+def time_plot(acc, jerk, ax_princ):
+
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    # Reset of the plot layout
+    pio.templates.default = "none"
+
+    n_acc = len([h for h in acc.columns if h.startswith('t_')])
+
+    data = []
+    for n in range(1, n_acc + 1):
+        data.append(go.Scatter(x=acc['t_' + str(n)], y=acc['Ax_' + str(n)], name="A" + str(n) + ": x", opacity=0.8))
+
+    data.append(go.Scatter(
+            x=acc['t_' + ax_princ.split('_')[1]],
+            y=jerk,
+            customdata=np.arange(0, acc.shape[0], 1),
+            name="jerk " + ax_princ,
+            hovertemplate="Time: %{x:.3f} s<br>" + "Sample: %{customdata:.1f} <br>" + "Jerk: %{y:.2f} m/s^3" + " <extra></extra>",
+            opacity=0.8))
+
+    for n in range(1, n_acc + 1):
+        data.append(go.Scatter(x=acc['t_' + str(n)], y=acc['Az_' + str(n)], name="A" + str(n) + ": z", opacity=0.8))
+
+    fig = go.Figure(data=data, layout=dict(title='Display of the acelerations (time domain):'))
+
+    fig.update_xaxes(title_text="Time [s]")
+    fig.update_yaxes(title_text="Acceleration [m/s^2]; Jerk [m/s^3]")
+
+    return fig
+
+
+# Post-processing of a run (offsets already cancelled), shared by data_aq.py and the recorder service:
+# recording and time plot into the run archive, trigger report, metrics store and ensemble statistics
+
+def process_run(acc, data_inizio, samp=0.005, ax_princ='Az_2', t=100, jerk_perc=350, pre_tr=20, trig=1,
+                path='', rec_ext='.csv', cal_file='calibration4.csv', metrics_file='metrics.db',
+                ensemble_file='ensemble.npz', zip_method='deflate', zip_level=6, json_file=1, extra=None):
+
+    from run_archive import RunArchive
+    from graphic_plot import PlotAcc
+    from metrics_db import MetricsDB
+    from ensemble import EnsembleAcc
+    from report import ReportAcc
+
+    nomefile = 'Acceleration_' + data_inizio + rec_ext
+    nomezip = path + 'acceldata_' + data_inizio + '.zip'
+
+    res = {'file': nomezip, 'trigger': False}
+
+    archive = RunArchive(nomezip, method=zip_method, level=zip_level)
+
+    # The archive is closed also when the post-processing fails:
+    try:
+        if rec_ext == '.npy':
+            # Kept on disk (memory-mapped by the post-processing) and copied into the archive:
+            from acc_io import save_acc
+            from chunked import ChunkedAcc
+            save_acc(acc, path + nomefile)
+            archive.add_file(path + nomefile)
+            recording = ChunkedAcc(path + nomefile)
+        else:
+            archive.add_df(nomefile, acc)
+            recording = acc
+
+        nomegraf = 'Time_Domain_Plot_' + data_inizio + '.html'
+        archive.add_figure(nomegraf, time_plot(acc, np.gradient(acc[ax_princ], samp), ax_princ))
+
+        # Other files of the run (e.g. range changes), name: bytes
+        for nome, data in (extra or {}).items():
+            archive.add_bytes(nome, data)
+
+        if trig == 1:
+            plotrigger = PlotAcc(df=recording, samp=samp, t=t, jerk_perc=jerk_perc, pre_tr=pre_tr, ax_princ=ax_princ,
+                                 archive=archive)
+
+            # Transient check and report of every axis (layout template built once, no browser), every figure also
+            # serialized in bulk into report.json:
+            results = ReportAcc(plotrigger, json_file=json_file).render([h for h in acc.columns if not h.startswith('t_')])
+
+            if results:
+                if os.path.exists(cal_file):
+                    archive.add_file(cal_file)
+
+                # Metrics, parameters and files of the run into the metrics store:
+                db = MetricsDB(metrics_file)
+                db.add_run(data_inizio, plotrigger, results,
+                           files=[('data', nomefile), ('time plot', nomegraf), ('archive', nomezip)])
+                db.close()
+
+                res['trigger'] = True
+
+                # Ensemble file with different histogram bins: kept untouched, the run is archived anyway
+                try:
+                    EnsembleAcc(ensemble_file).merge(results)
+                except ValueError as error:
+                    print("\n Error: ", error, "\n")
+                    res['error'] = str(error)
+    finally:
+        archive.close()
+
+    return res
@@ -0,0 +1,124 @@
+import csv
+import io
+import time
+import numpy as np
+
+
+class RangeControl:
+
+    GRAVITIY_MS2 = 9.80665
+
+    # Ranges of the mpu6050: register value, full scale [g], scale modifier
+    RANGES = [(0x00, 2, 16384.0), (0x08, 4, 8192.0), (0x10, 8, 4096.0), (0x18, 16, 2048.0)]
+
+    def __init__(self,
+                 sensors,
+                 block=200,
+                 limit=0.98,
+                 adapt=1,
+                 max_range=16):
+
+        self.sensors = sensors              # mpu6050 instances
+        self.block = block                  # 200   # Samples of every checked block
+        self.limit = limit                  # 0.98  # Saturation threshold (fraction of the full scale)
+        self.adapt = adapt                  # 1     # Switches the clipped sensors to the next range between blocks
+        self.max_range = max_range          # 16    # Maximum range [g]
+
+        self.limit_count = int(limit * 32768)
+
+        # Starting range of every sensor (from the scale set with set_accel_range):
+        scales = [r[2] for r in self.RANGES]
+        self.level = [scales.index(getattr(s, 'scale', 16384.0)) for s in sensors]
+        self.factor = np.array([self.GRAVITIY_MS2 / self.RANGES[lv][2] for lv in self.level])
+
+        self.raw = np.empty([block, len(sensors), 2], dtype=np.int32)
+        self.k = 0                          # Samples in the current block
+        self.i = 0                          # Samples read
+
+        self.clipped = np.zeros(len(sensors), dtype=np.int64)
+        self.peak = np.zeros(len(sensors), dtype=np.int64)
+        self.changes = []
+
+    # Reads every sensor (raw counts), returns the row in m/s^2: [t_1, x_1, z_1, t_2, x_2, z_2, ...]
+
+    def read(self):
+
+        row = []
+        raw = self.raw[self.k]
+
+        for n, sensor in enumerate(self.sensors):
+            raw[n] = sensor.get_accel_raw()
+            f = self.factor[n]
+            row += [time.time(), raw[n, 0] * f, raw[n, 1] * f]
+
+        self.k += 1
+        self.i += 1
+
+        if self.k == self.block:
+            self.check()
+
+        return row
+
+    # Vectorized saturation check of the block and range switching (before the next block):
+
+    def check(self):
+
+        blk = np.abs(self.raw[:self.k])
+        self.k = 0
+
+        n_clip = (blk >= self.limit_count).any(axis=2).sum(axis=0)
+        self.clipped += n_clip
+        self.peak = np.maximum(self.peak, blk.max(axis=(0, 2)))
+
+        if self.adapt == 1:
+            for n in np.flatnonzero(n_clip):
+                lv = self.level[n] + 1
+                if lv < len(self.RANGES) and self.RANGES[lv][1] <= self.max_range:
+                    self.sensors[n].set_accel_range(self.RANGES[lv][0])
+                    self.level[n] = lv
+                    self.factor[n] = self.GRAVITIY_MS2 / self.RANGES[lv][2]
+
+                    # First sample converted with the new range:
+                    self.changes.append({'sample': self.i, 'sensor': n + 1, 'range': self.RANGES[lv][1],
+                                         'clipped': int(n_clip[n])})
+
+        return n_clip
+
+    # Clipping statistics of every sensor:
+
+    def report(self):
+
+        if self.k > 0:
+            self.check()
+
+        res = []
+        for n in range(len(self.sensors)):
+            res.append({'sensor': n + 1, 'clipped': int(self.clipped[n]),
+                        'perc': round(100 * self.clipped[n] / max(self.i, 1), 3),
+                        'range': self.RANGES[self.level[n]][1]})
+            print(" Accelerometer ", n + 1, "\tClipped samples: ", res[-1]['clipped'], "(", res[-1]['perc'], "% )",
+                  "\tFinal range: +-", res[-1]['range'], "g")
+
+        for ch in self.changes:
+            print(" Range change, sample ", ch['sample'], "\tAccelerometer ", ch['sensor'], "\t+-", ch['range'], "g")
+
+        return res
+
+    # Range changes and clipping statistics as .csv text:
+
+    def to_csv(self):
+
+        buf = io.StringIO()
+        writer = csv.writer(buf, delimiter=';')
+
+        writer.writerow(["Sample", "Accelerometer", "Range [g]", "Clipped samples in the block"])
+        for ch in self.changes:
+            writer.writerow([ch['sample'], ch['sensor'], ch['range'], ch['clipped']])
+
+        writer.writerow([])
+        writer.writerow(["Accelerometer", "Clipped samples", "Clipped samples [%]", "Final range [g]"])
+        for n in range(len(self.sensors)):
+            writer.writerow([n + 1, int(self.clipped[n]), round(100 * self.clipped[n] / max(self.i, 1), 3),
+                             self.RANGES[self.level[n]][1]])
+
+        return buf.getvalue()
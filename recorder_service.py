@@ -0,0 +1,303 @@
+import asyncio
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime as dt
+from statistics import mean
+from statistics import pstdev
+import numpy as np
+from acc_io import check_format
+
+
+# Post-processing of a run (executed in a separate process, the sampling thread keeps the GIL for itself):
+# offset cancellation, then the same post-processing of data_aq.py
+
+def postprocess(getdata, header, start, data_inizio, cal_file, path, samp, ax_princ, t, jerk_perc, pre_tr, rec_ext,
+                metrics_file, ensemble_file):
+
+    import pandas as pd
+    from post_processing import process_run
+
+    acc = pd.DataFrame(np.around(getdata, decimals=5), columns=header)
+
+    # Time offset:
+    for h in header:
+        if h.startswith('t_'):
+            acc[h] -= start
+
+    # Acceleration offset:
+    if os.path.exists(cal_file):
+        cal = pd.read_csv(cal_file, sep=';')
+        for h in header:
+            if not h.startswith('t_'):
+                acc[h] -= round(float(cal[h][0]), 2)
+
+    return process_run(acc, data_inizio, samp=samp, ax_princ=ax_princ, t=t, jerk_perc=jerk_perc, pre_tr=pre_tr,
+                       path=path, rec_ext=rec_ext, cal_file=cal_file, metrics_file=metrics_file,
+                       ensemble_file=ensemble_file)
+
+
+class RecorderService:
+
+    def __init__(self,
+                 sensors,
+                 samp=0.005,
+                 i_max=600,
+                 i_max_c=12000,
+                 ax_princ='Az_2',
+                 t=100,
+                 jerk_perc=350,
+                 pre_tr=20,
+                 path='./',
+                 rec_ext='.csv',
+                 cal_file='calibration4.csv',
+                 metrics_file='metrics.db',
+                 ensemble_file='ensemble.npz',
+                 sock='/tmp/recorder.sock',
+                 scheduler=None):
+
+        self.sensors = sensors              # Accelerometers (mpu6050 instances or replayed sensors)
+        self.samp = samp                    # 0.005 # Sampleperiod: samp=1/samplerate
+        self.i_max = i_max                  # 600   # Samples of every run
+        self.i_max_c = i_max_c              # 12000 # Samples of the calibration
+        self.ax_princ = ax_princ            # Principal axis of the post-processing trigger
+        self.t = t                          # 100   # Samples of the post-processing window
+        self.jerk_perc = jerk_perc          # 350   # Post-processing trigger threshold (percentage, as in data_aq.py)
+        self.pre_tr = pre_tr                # 20    # Pre-trigger samples
+        self.path = path                    # Output folder
+        self.rec_ext = rec_ext              # Recording format
+        check_format(rec_ext)
+        self.cal_file = cal_file            # Calibration file
+        self.metrics_file = metrics_file    # Metrics store
+        self.ensemble_file = ensemble_file  # Ensemble statistics
+        self.sock = sock                    # Unix socket of the control interface
+        self.scheduler = scheduler          # MuxScheduler of sensors (multiplexed arrays), reads in optimized order
+
+        self.header = []
+        for n in range(len(sensors)):
+            self.header += ['t_' + str(n + 1), 'Ax_' + str(n + 1), 'Az_' + str(n + 1)]
+
+        self.state = 'idle'
+        self.pending = 0                    # Runs still to be recorded (back to back)
+        self.done = 0
+        self.saving = 0                     # Runs in post-processing
+        self.last = None                    # Result of the last post-processed run
+        self.stop_ev = threading.Event()
+
+    # Blocking sampling loop (run in a thread by the event loop):
+
+    def acquire(self, n_samp):
+
+        getdata = np.empty([n_samp, len(self.header)])
+        samp = self.samp
+
+        start = time.time()
+        for _ in range(n_samp):
+            if self.stop_ev.is_set():
+                getdata = getdata[:_]
+                break
+
+            if self.scheduler is not None:
+                row = self.scheduler.read_row()
+            else:
+                row = []
+                for sensor in self.sensors:
+                    accel_data = sensor.get_accel_data_2g()
+                    row += [time.time(), accel_data[0], accel_data[1]]
+            getdata[_] = row
+
+            # Sleeptime to maintain a constant sample rate:
+            time.sleep(max(0.0, samp - (time.time() % samp)))
+
+        return getdata, start
+
+    # Calibration (as in data_aq.py), the mean values and standard deviations are saved into cal_file
+    # (only for a complete calibration: a stopped one keeps the previous file):
+
+    def calibrate_sync(self):
+
+        getdata, _ = self.acquire(self.i_max_c)
+        if getdata.shape[0] < self.i_max_c:
+            return False
+
+        acc_col = [n for n, h in enumerate(self.header) if not h.startswith('t_')]
+
+        with open(self.cal_file, 'w', newline='') as CalibFile:
+            writer = csv.writer(CalibFile, delimiter=';')
+            writer.writerow(["Acceleration axes"] + [self.header[c] for c in acc_col])
+            writer.writerow(['Mean value: '] + [round(mean(getdata[:, c]), 2) for c in acc_col])
+            writer.writerow(['Standard deviation: '] + [round(pstdev(getdata[:, c]), 5) for c in acc_col])
+
+        return True
+
+    async def calibrate(self):
+
+        self.state = 'calibrating'
+        self.stop_ev.clear()
+        try:
+            if await asyncio.get_event_loop().run_in_executor(None, self.calibrate_sync):
+                self.last = {'calibration': self.cal_file}
+            else:
+                self.last = {'error': 'calibration stopped, ' + self.cal_file + ' not updated'}
+        except Exception as error:
+            self.last = {'error': 'calibration: ' + str(error)}
+        finally:
+            self.state = 'idle'
+
+    # Back to back runs: the next run starts while the previous one is saved and post-processed
+
+    async def record(self):
+
+        loop = asyncio.get_event_loop()
+        self.state = 'recording'
+        self.stop_ev.clear()
+
+        try:
+            while self.pending > 0 and not self.stop_ev.is_set():
+                data_inizio = dt.now().strftime('%Y-%m-%d-%H-%M-%S')
+
+                getdata, start = await loop.run_in_executor(None, self.acquire, self.i_max)
+                self.pending -= 1
+                self.done += 1
+
+                if getdata.shape[0] > 0:
+                    self.saving += 1
+                    fut = loop.run_in_executor(self.pool, postprocess, getdata, self.header, start, data_inizio,
+                                               self.cal_file, self.path, self.samp, self.ax_princ, self.t,
+                                               self.jerk_perc, self.pre_tr, self.rec_ext, self.metrics_file,
+                                               self.ensemble_file)
+                    asyncio.ensure_future(self.saved(fut))
+        except Exception as error:
+            self.last = {'error': 'acquisition: ' + str(error)}
+        finally:
+            self.pending = 0
+            self.state = 'idle'
+
+    async def saved(self, fut):
+        try:
+            self.last = await fut
+        except Exception as error:
+            self.last = {'error': str(error)}
+        self.saving -= 1
+
+    # Control interface: one command per line, one JSON answer per command
+
+    def status(self):
+        return {'state': self.state, 'pending': self.pending, 'done': self.done, 'saving': self.saving,
+                'last': self.last}
+
+    async def command(self, line):
+
+        cmd = line.split()
+
+        if not cmd:
+            return {'error': 'empty command'}
+
+        if cmd[0] == 'start':
+            n = int(cmd[1]) if len(cmd) > 1 else 1
+            if n < 1:
+                return {'error': 'the number of runs must be at least 1'}
+            if self.state == 'calibrating':
+                return {'error': 'calibration running'}
+            if self.state == 'recording' and self.stop_ev.is_set():
+                return {'error': 'stopping'}
+            self.pending += n
+            if self.state == 'idle':
+                asyncio.ensure_future(self.record())
+                self.state = 'recording'
+        elif cmd[0] == 'stop':
+            self.pending = 0
+            self.stop_ev.set()
+        elif cmd[0] == 'calibrate':
+            if self.state != 'idle':
+                return {'error': 'busy: ' + self.state}
+            self.state = 'calibrating'
+            asyncio.ensure_future(self.calibrate())
+        elif cmd[0] == 'quit':
+            self.pending = 0
+            self.stop_ev.set()
+            self.quit.set()
+        elif cmd[0] != 'status':
+            return {'error': 'unknown command: ' + cmd[0]}
+
+        return self.status()
+
+    async def client(self, reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                answer = await self.command(line.decode().strip())
+            except ValueError as error:
+                answer = {'error': str(error)}
+            writer.write((json.dumps(answer) + '\n').encode())
+            await writer.drain()
+        writer.close()
+
+    async def serve(self):
+
+        self.quit = asyncio.Event()
+
+        if os.path.exists(self.sock):
+            os.remove(self.sock)
+
+        server = await asyncio.start_unix_server(self.client, path=self.sock)
+        print("\n Recorder service listening on: ", self.sock, "\n")
+
+        await self.quit.wait()
+
+        server.close()
+        await server.wait_closed()
+
+        # Waits the last post-processing operations:
+        while self.saving > 0 or self.state != 'idle':
+            await asyncio.sleep(0.1)
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        with ProcessPoolExecutor(max_workers=1) as self.pool:
+            loop.run_until_complete(self.serve())
+
+        loop.close()
+
+
+# Sends a command to a running service (e.g. python recorder_service.py start 3):
+
+def control(line, sock='/tmp/recorder.sock'):
+
+    async def send():
+        reader, writer = await asyncio.open_unix_connection(sock)
+        writer.write((line + '\n').encode())
+        answer = await reader.readline()
+        writer.close()
+        return json.loads(answer.decode())
+
+    loop = asyncio.new_event_loop()
+    answer = loop.run_until_complete(send())
+    loop.close()
+
+    return answer
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1:
+        print(control(' '.join(sys.argv[1:])))
+    else:
+        from mpu6050 import mpu6050
+
+        # Accelerometers and I2C busses definition (as in data_aq.py):
+        mpus = [mpu6050(0x68), mpu6050(0x69), mpu6050(0x68, bus=4), mpu6050(0x69, bus=4)]
+
+        for mpu in mpus:
+            mpu.set_accel_range(mpu.ACCEL_RANGE_2G)
+            mpu.set_dlpf(3)
+
+        RecorderService(mpus).run()
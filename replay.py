@@ -0,0 +1,188 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from acc_io import load_acc, save_acc
+from online_trigger import OnlineTrigger
+
+
+# Replayed accelerometer: same reading interface of the mpu6050 class. The exported recordings have the offsets
+# already cancelled, so they are added back: the acquisition sees the raw output of the mpu6050
+
+class ReplaySensor:
+
+    def __init__(self, source, n):
+        self.source = source
+        self.cols = source.cols[n]
+        self.off = source.off[2 * n:2 * n + 2]
+
+    def get_accel_data_2g(self, g=False):
+        row = self.source.data[self.source.i]
+        x = row[self.cols[1]] + self.off[0]
+        z = row[self.cols[2]] + self.off[1]
+        if g is True:
+            return [x / 9.80665, z / 9.80665]
+        return [x, z]
+
+    def get_time(self):
+        return self.source.data[self.source.i, self.cols[0]]
+
+
+class Replay:
+
+    def __init__(self,
+                 nomefile,
+                 samp=0.005,
+                 speed=1,
+                 n_acc=4,
+                 cal_file='calibration4.csv',
+                 online_trig=0,
+                 jerk_cr=350,
+                 pre_tr=20,
+                 t=100,
+                 jerk_perc=70,
+                 ax_princ='Az_2',
+                 out_path='replay/'):
+
+        self.samp = samp                    # 0.005 # Sampleperiod: samp=1/samplerate
+        self.speed = speed                  # 1     # Replay speed (1: real time, k: k times faster, 0: as fast as possible)
+        self.n_acc = n_acc                  # 4     # Number of accelerometers
+        self.cal_file = cal_file            # Calibration file (offsets), zero offsets when missing
+        self.online_trig = online_trig      # 0     # Activates the online jerk trigger
+        self.jerk_cr = jerk_cr              # 350   # Online trigger threshold [m/s^3]
+        self.pre_tr = pre_tr                # 20    # Pre-trigger samples
+        self.t = t                          # 100   # Samples of the post-processing window
+        self.jerk_perc = jerk_perc          # 70    # Post-processing trigger threshold (percentage)
+        self.ax_princ = ax_princ            # Principal axis
+        self.out_path = out_path            # Folder of the replayed run
+
+        self.header = []
+        for n in range(n_acc):
+            self.header += ['t_' + str(n + 1), 'Ax_' + str(n + 1), 'Az_' + str(n + 1)]
+
+        df = load_acc(nomefile, columns=self.header)
+        self.data = df[self.header].to_numpy(dtype=float)
+        self.cols = [[3 * n, 3 * n + 1, 3 * n + 2] for n in range(n_acc)]
+        self.i = 0
+
+        self.off = self.offsets()
+        self.sensors = [ReplaySensor(self, n) for n in range(n_acc)]
+
+        # read: sensors, buffer: row into the run array, trigger: online trigger, pacing: sleep of the sample rate,
+        # write: export of the recording, post-processing: trigger search and report
+        self.stages = {'read': 0.0, 'buffer': 0.0, 'trigger': 0.0, 'pacing': 0.0, 'write': 0.0, 'post-processing': 0.0}
+
+    # Calibration offsets, read as in data_aq.py:
+
+    def offsets(self):
+        if os.path.exists(self.cal_file):
+            cal = pd.read_csv(self.cal_file, sep=';')
+            return np.round(np.asarray(cal.values[0][1:2 * self.n_acc + 1], dtype=float), 2)
+        return np.zeros(2 * self.n_acc)
+
+    # Replay of the whole recording through acquisition, writer, trigger and post-processing:
+
+    def run(self, post=1):
+
+        os.makedirs(self.out_path, exist_ok=True)
+
+        i_max = self.data.shape[0]
+        getdata = np.empty([i_max, 3 * self.n_acc])
+        period = self.samp / self.speed if self.speed else 0
+
+        if self.online_trig == 1:
+            evtrig = OnlineTrigger(header=self.header, samp=self.samp, t=self.t, jerk_cr=self.jerk_cr,
+                                   pre_tr=self.pre_tr, ax_princ=self.ax_princ, nome=self.out_path + 'Event_')
+
+        perf = time.perf_counter
+        start = perf()
+
+        for _ in range(i_max):
+            self.i = _
+
+            t0 = perf()
+            row = []
+            for sensor in self.sensors:
+                accel_data = sensor.get_accel_data_2g()
+                row += [sensor.get_time(), accel_data[0], accel_data[1]]
+
+            t1 = perf()
+            getdata[_] = row
+
+            t2 = perf()
+            if self.online_trig == 1:
+                evtrig.push(row)
+
+            t3 = perf()
+
+            # Same pacing of the acquisition loop, scaled by the replay speed:
+            if period:
+                time.sleep(max(0.0, start + (_ + 1) * period - perf()))
+
+            t4 = perf()
+
+            self.stages['read'] += t1 - t0
+            self.stages['buffer'] += t2 - t1
+            self.stages['trigger'] += t3 - t2
+            self.stages['pacing'] += t4 - t3
+
+        if self.online_trig == 1:
+            evtrig.close()
+
+        elapsed = perf() - start
+
+        if post == 1:
+            self.post(getdata)
+
+        return self.report(i_max, elapsed)
+
+    # Offset cancellation, export and trigger post-processing (as in data_aq.py):
+
+    def post(self, getdata):
+
+        from graphic_plot import PlotAcc
+        from report import ReportAcc
+
+        t0 = time.perf_counter()
+        acc = pd.DataFrame(np.around(getdata, decimals=5), columns=self.header)
+
+        # Offsets added back by the replayed sensors:
+        for n in range(self.n_acc):
+            acc['Ax_' + str(n + 1)] -= self.off[2 * n]
+            acc['Az_' + str(n + 1)] -= self.off[2 * n + 1]
+
+        save_acc(acc, self.out_path + 'Acceleration_replay.csv')
+
+        t1 = time.perf_counter()
+        plotrigger = PlotAcc(samp=self.samp, t=self.t, jerk_perc=self.jerk_perc, pre_tr=self.pre_tr,
+                             ax_princ=self.ax_princ, path=self.out_path)
+
+        results = ReportAcc(plotrigger).render([h for h in self.header if not h.startswith('t_')])
+
+        self.stages['write'] = t1 - t0
+        self.stages['post-processing'] = time.perf_counter() - t1
+
+        return results
+
+    # Throughput of every stage:
+
+    def report(self, i_max, elapsed):
+
+        res = {'samples': i_max, 'elapsed': elapsed, 'rate': i_max / elapsed, 'stages': {}}
+
+        print("\n Replay: ", i_max, "samples in ", round(elapsed, 3), "s (", round(i_max / elapsed), "samples/s )\n")
+
+        for stage, t_stage in self.stages.items():
+            if t_stage == 0:
+                continue
+            rate = i_max / t_stage
+            res['stages'][stage] = {'time': t_stage, 'rate': rate}
+            print(" ", stage.ljust(16), round(t_stage, 4), "s\t", round(rate), "samples/s")
+
+        # The pacing sleep is not a cost: the sustainable rate is set by the acquisition stages and by the writer
+        busy = sum(t_stage for stage, t_stage in self.stages.items() if stage not in ('pacing', 'post-processing'))
+        res['max_rate'] = i_max / busy
+
+        print("\n Maximum sustainable sample rate: ", round(res['max_rate']), "Hz (target", round(1 / self.samp), "Hz)\n")
+
+        return res
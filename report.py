@@ -0,0 +1,196 @@
+import copy
+import random
+import numpy as np
+import plotly.io as pio
+import scipy.fft
+from scipy import signal
+from plotly.subplots import make_subplots
+
+
+class ReportAcc:
+
+    def __init__(self, plotinstance, json_file=0):
+
+        self.p = plotinstance               # PlotAcc instance (parameters, recording, trigger, archive)
+        self.json_file = json_file          # 0     # Saves every figure into a single report.json when set to 1
+
+        self.none = pio.templates["none"].to_plotly_json()
+        self.layout = self.template()
+
+    # Three rows layout (time, frequency, jerk) built once and reused by every axis:
+
+    def template(self):
+
+        fig = make_subplots(rows=3, cols=1, subplot_titles=("Time domain", "Frequency domain", "Jerk"))
+
+        axis_style = dict(showgrid=False, gridwidth=1, gridcolor='black', zerolinecolor='black', zerolinewidth=0.1,
+                          mirror=True, ticks='outside', showline=True, tickwidth=1, tickcolor='black', ticklen=5)
+
+        f_max = int((1 / self.p.samp) / 2)
+
+        fig.update_xaxes(row=1, col=1, zeroline=False, title_text="Time [s]", **axis_style)
+        fig.update_yaxes(row=1, col=1, zeroline=True, title_text="Acceleration [m/s^2]", **axis_style)
+        fig.update_xaxes(row=2, col=1, zeroline=False, title_text="Frequency [Hz]", range=[-1, f_max], **axis_style)
+        fig.update_yaxes(row=2, col=1, zeroline=True, title_text="Amplitude [m/s^2]", **axis_style)
+        fig.update_xaxes(row=3, col=1, zeroline=False, title_text="Time [s]", **axis_style)
+        fig.update_yaxes(row=3, col=1, zeroline=True, title_text="Jerk [m/s^3]", **axis_style)
+
+        fig.update_layout(height=1020, width=1480, bargap=0.75, barmode='overlay', legend_orientation="h",
+                          template="none")
+
+        return fig.to_plotly_json()['layout']
+
+    # Windows, metrics and spectra of every axis in one pass:
+
+    def compute(self, axes, trigcalc):
+
+        p = self.p
+        trigger = trigcalc['trigger']
+
+        df = p.window(list(axes), trigger - p.pre_tr, trigger + p.t - p.pre_tr)
+        win = np.asarray(df[list(axes)], dtype=float).T
+
+        if p.wind:
+            win = win * signal.windows.exponential(M=p.t, center=0, tau=p.t / 5, sym=False)
+
+        s = p.t // 2
+        ris = 1 / (p.t * p.samp)
+        f_max = int((1 / p.samp) / 2)
+
+        peak_max = np.round(win.max(axis=1), 2)
+        peak_min = np.round(win.min(axis=1), 2)
+
+        return {'win': win,
+                'jerk': np.gradient(win, p.samp, axis=1),
+                'rms': np.round(np.sqrt(np.mean(win ** 2, axis=1)), 3),
+                'peak_plus': np.round(np.maximum(peak_max, np.abs(peak_min)), 2),
+                'peak_peak': np.round(peak_max - peak_min, 2),
+                'fft': 2 / p.t * np.abs(scipy.fft.fft(win, axis=1)[:, 1:s]),
+                'xf': np.arange(ris, f_max, ris),
+                'ris': ris,
+                'time': np.arange(0, p.t * p.samp, p.samp)[:p.t]}
+
+    # Figure (plain dict) of an axis from the template:
+
+    def figure(self, asse, n, arr):
+
+        layout = copy.deepcopy(self.layout)
+
+        for ann, title in zip(layout['annotations'], ("Time domain ", "Frequency domain ", "Jerk ")):
+            ann['text'] = title + asse
+
+        yf = arr['fft'][n]
+        layout['yaxis2']['range'] = [0, float(np.max(yf + yf / 10))]
+
+        rcolor = "#%06x" % random.randint(0, 0xFFFFFF)
+
+        data = [
+            dict(type='scatter', x=arr['time'], y=arr['win'][n], name="Acc. " + asse, line=dict(color=rcolor),
+                 opacity=0.8, xaxis='x', yaxis='y',
+                 hovertemplate="Time: %{x:.3f} s<br>" + "Acc: %{y:.2f} m/s^2" + " <extra></extra>"),
+            dict(type='bar', x=arr['xf'], y=yf, showlegend=False, hoverinfo='skip', xaxis='x2', yaxis='y2',
+                 marker=dict(color='#EB7122', opacity=0.5)),
+            dict(type='scatter', x=arr['xf'], y=yf, name="FFT " + asse, mode='markers', marker=dict(color='#EB7122'),
+                 opacity=0.8, xaxis='x2', yaxis='y2',
+                 hovertemplate="Freq: %{x:.2f} Hz<br>" + "Amp: %{y:.2f} m/s^2" + " <extra></extra>"),
+            dict(type='scatter', x=arr['time'], y=arr['jerk'][n], name="Jerk " + asse, line=dict(color='#7F7F7F'),
+                 opacity=0.8, xaxis='x3', yaxis='y3',
+                 hovertemplate="Time: %{x:.3f} s<br>" + "Jerk: %{y:.2f} m/s^3" + " <extra></extra>"),
+        ]
+
+        return {'data': data, 'layout': layout}
+
+    def table(self, header, cells, title):
+        return {'data': [dict(type='table', header=dict(values=header), cells=dict(values=cells), visible=True)],
+                'layout': dict(title=dict(text=title), template=self.none)}
+
+    # Trigger table and principal axis jerk:
+
+    def trigger_figures(self, trigcalc):
+
+        p = self.p
+        trigger = trigcalc['trigger']
+        deriv_acc = trigcalc['deriv_acc']
+        jerk_cr = trigcalc['jerk_cr']
+
+        if p.manual_start == 0:
+            print(" \n Critic Jerk: ", round(jerk_cr), "m/s^3 \n")
+            tab1 = self.table(["Principal axis", "Jerk Trigger Threshold[m/s^3]",
+                               'Trigger iteration of the principal axis', "Jerk Trigger Value [m/s^3]"],
+                              [p.ax_princ, round(jerk_cr), trigger, round(deriv_acc[trigger])], 'Trigger result:')
+        else:
+            tab1 = self.table(["Principal axis", 'Manual start iteration', "Start Jerk [m/s^3]"],
+                              [p.ax_princ, trigger, round(deriv_acc[trigger])], 'Manual iteration:')
+
+        n = np.size(deriv_acc)
+        step = max(1, -(-n // p.n_plot))
+        fig1 = {'data': [dict(type='scatter', x=np.arange(0, n, step) * p.samp, y=np.asarray(deriv_acc[::step]),
+                              customdata=np.arange(0, n, step),
+                              line=dict(color='blue'), opacity=0.8,
+                              hovertemplate="Time: %{x:.3f} s <br>" + "Sample: %{customdata:.1f} <br>" + "Jerk: %{y:.2f} m/s^3 <br>" + " <extra></extra>")],
+                'layout': dict(title=dict(text="Principal axis jerk (time domain " + p.ax_princ + ")"),
+                               xaxis=dict(title=dict(text="Time [s]")), yaxis=dict(title=dict(text="Jerk [m/s^3]")),
+                               font=dict(family="Courier New, monospace", size=18, color="#7f7f7f"),
+                               template=self.none)}
+
+        return {'principal axis jerk.html': fig1, 'trigger tab.html': tab1}
+
+    # Every figure of the report, results as returned by PlotAcc.plot:
+
+    def render(self, axes):
+
+        p = self.p
+        trigcalc = p.triggcalc()
+
+        if trigcalc is False:
+            return False
+
+        arr = self.compute(axes, trigcalc)
+        figs = {}
+        results = []
+
+        if p.ax_princ in axes:
+            figs.update(self.trigger_figures(trigcalc))
+
+        for n, asse in enumerate(axes):
+            figs['acceleration tab ' + asse + '.html'] = self.table(
+                ["Axis", "RMS [m/s^2]", "Maximum Peak (absolute value) [m/s^2]", "Peak to Peak [m/s^2]",
+                 'Spectral resolution [Hz]'],
+                [asse, arr['rms'][n], arr['peak_plus'][n], arr['peak_peak'][n], round(arr['ris'], 2)], 'Values:')
+            figs['acceleration plot ' + asse + '.html'] = self.figure(asse, n, arr)
+
+            res = {'axis': asse, 'rms': float(arr['rms'][n]), 'peak': float(arr['peak_plus'][n]),
+                   'peak_peak': float(arr['peak_peak'][n]), 'ris': float(arr['ris']),
+                   'xf': arr['xf'], 'fft': arr['fft'][n]}
+
+            if asse == p.ax_princ:
+                res.update({'trigger': int(trigcalc['trigger']), 'jerk_cr': float(trigcalc['jerk_cr']),
+                            'jerk_trig': float(trigcalc['deriv_acc'][trigcalc['trigger']])})
+            results.append(res)
+
+        self.save(figs)
+
+        return results
+
+    # Serialization of every figure (html files, optionally one report.json):
+
+    def save(self, figs):
+
+        p = self.p
+
+        for nome, fig in figs.items():
+            if p.archive is not None:
+                p.archive.add_figure(nome, fig, validate=False)
+            else:
+                pio.write_html(fig, file=p.path + nome, auto_open=False, validate=False)
+
+            if p.show:
+                pio.show(fig, validate=False)
+
+        if self.json_file == 1:
+            report = pio.json.to_json_plotly(figs).encode()
+            if p.archive is not None:
+                p.archive.add_bytes('report.json', report)
+            else:
+                with open(p.path + 'report.json', 'wb') as f:
+                    f.write(report)
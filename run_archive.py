@@ -0,0 +1,134 @@
+import bz2
+import hashlib
+import io
+import json
+import os
+import queue
+import threading
+import time
+import zipfile
+import zlib
+import plotly.io as pio
+
+
+class RunArchive:
+
+    # Compression methods:
+    METHODS = {'deflate': zipfile.ZIP_DEFLATED, 'lzma': zipfile.ZIP_LZMA, 'bzip2': zipfile.ZIP_BZIP2}
+
+    def __init__(self, nomezip, method='deflate', level=6, big=1 << 20, js='plotly.min.js'):
+
+        self.nomezip = nomezip              # Archive name
+        self.method = method                # 'deflate' # Compression method
+        self.level = level                  # 6     # Compression level (deflate/bzip2)
+        self.big = big                      # 1 MB  # Members bigger than this are compressed in the background
+        self.js = js                        # plotly.js is stored once and shared by every html (None: embedded)
+
+        self.zipfold = zipfile.ZipFile(nomezip, 'w', compression=self.METHODS[method], compresslevel=level)
+        self.manifest = []
+        self.lock = threading.Lock()
+
+        # Background compression of the big members:
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+        if js is not None:
+            from plotly.offline import get_plotlyjs
+            self.add_bytes(js, get_plotlyjs().encode())
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            self.write(*job, precompress=True)
+
+    # Compression of a member outside the lock (same streams of zipfile), None for lzma (compressed by zipfile):
+
+    def compress(self, data):
+        if self.method == 'deflate':
+            comp = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            return comp.compress(data) + comp.flush()
+        if self.method == 'bzip2':
+            return bz2.compress(data, self.level)
+        return None
+
+    # Writes a member and its manifest entry (the zip file is shared, one member at a time).
+    # Precompressed members only hold the lock while the compressed bytes are written:
+
+    def write(self, nome, data, date_time=None, precompress=False):
+
+        info = zipfile.ZipInfo(nome, date_time=date_time or time.localtime()[:6])
+        info.compress_type = self.METHODS[self.method]
+
+        comp = self.compress(data) if precompress else None
+
+        with self.lock:
+            if comp is None:
+                self.zipfold.writestr(info, data, compresslevel=self.level)
+            else:
+                self.write_raw(info, data, comp)
+            size = self.zipfold.getinfo(nome).compress_size
+
+        self.manifest.append({'file': nome, 'size': len(data), 'compressed': size,
+                              'sha256': hashlib.sha256(data).hexdigest()})
+
+    # Local header and already compressed data, the central directory is written by ZipFile.close:
+
+    def write_raw(self, info, data, comp):
+
+        zf = self.zipfold
+        info.file_size = len(data)
+        info.compress_size = len(comp)
+        info.CRC = zlib.crc32(data)
+
+        zf.fp.seek(zf.start_dir)
+        info.header_offset = zf.start_dir
+        zf.fp.write(info.FileHeader(zip64=info.file_size > zipfile.ZIP64_LIMIT))
+        zf.fp.write(comp)
+
+        zf.filelist.append(info)
+        zf.NameToInfo[info.filename] = info
+        zf.start_dir = zf.fp.tell()
+        zf._didModify = True
+
+    def add_bytes(self, nome, data, date_time=None):
+        if len(data) > self.big:
+            self.jobs.put((nome, data, date_time))
+        else:
+            self.write(nome, data, date_time)
+
+    # Figure serialized straight into the archive (no .html on disk):
+
+    def add_figure(self, nome, fig, validate=True):
+        html = pio.to_html(fig, include_plotlyjs=self.js if self.js is not None else True, full_html=True,
+                           validate=validate)
+        self.add_bytes(nome, html.encode())
+
+    # Recording serialized straight into the archive (format from the extension):
+
+    def add_df(self, nome, df):
+        from acc_io import save_acc
+        buf = io.BytesIO()
+        save_acc(df, nome, fobj=buf)
+        self.add_bytes(nome, buf.getvalue())
+
+    # Existing file (e.g. the calibration file):
+
+    def add_file(self, path, nome=None):
+        with open(path, 'rb') as f:
+            self.add_bytes(nome or os.path.basename(path), f.read(), time.localtime(os.path.getmtime(path))[:6])
+
+    # Waits the background compression, adds the manifest and closes the archive:
+
+    def close(self):
+
+        self.jobs.put(None)
+        self.worker.join()
+
+        manifest = sorted(self.manifest, key=lambda m: m['file'])
+        self.write('manifest.json', json.dumps(manifest, indent=1).encode())
+        self.zipfold.close()
+
+        return manifest
@@ -0,0 +1,127 @@
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import scipy.fft
+from scipy import signal
+from graphic_plot import PlotAcc
+
+
+class SpectroAcc:
+
+    def __init__(self,
+                 samp=0.005,
+                 nperseg=256,
+                 overlap=50,
+                 chunk=1024,
+                 n_bin=1000,
+                 workers=-1,
+                 path='C:/'):
+
+        self.samp = samp                    # 0.005 # Sampleperiod: samp=1/samplerate
+        self.nperseg = nperseg              # 256   # Number of samples of every FFT frame
+        self.overlap = overlap              # 50    # Overlap between consecutive frames (percentage)
+        self.chunk = chunk                  # 1024  # Number of frames processed at once
+        self.n_bin = n_bin                  # 1000  # Maximum number of time columns of the heatmap
+        self.workers = workers              # -1    # FFT threads (-1: every core)
+        self.path = path                    # path of the .csv file
+
+        self.step = nperseg - int(nperseg * overlap / 100)
+
+        # Cached window, scaling and work buffer (reused by every chunk):
+        self.window = signal.windows.hann(nperseg, sym=False)
+        self.scale = 2 * samp / np.sum(self.window ** 2)
+        self.work = np.empty([chunk, nperseg])
+
+    # Chunked STFT, the frames are averaged into at most n_bin time columns:
+
+    def spectrogram(self, x):
+
+        u = x.shape[0]
+
+        if u < self.nperseg:
+            print('\n Error: recording shorter than one frame! \n')
+            return False
+
+        n_fr = 1 + (u - self.nperseg) // self.step
+        n_bin = min(self.n_bin, n_fr)
+        nfreq = self.nperseg // 2 + 1
+
+        img = np.zeros([n_bin, nfreq])
+        cnt = np.zeros(n_bin)
+
+        for f0 in range(0, n_fr, self.chunk):
+            f1 = min(f0 + self.chunk, n_fr)
+            m = f1 - f0
+            work = self.work[:m]
+
+            # Only this chunk of the (memory-mapped) recording is read:
+            block = np.asarray(x[f0 * self.step:(f1 - 1) * self.step + self.nperseg], dtype=float)
+            seg = np.lib.stride_tricks.sliding_window_view(block, self.nperseg)[::self.step]
+
+            np.subtract(seg, seg.mean(axis=1, keepdims=True), out=work)
+            work *= self.window
+
+            spec = scipy.fft.rfft(work, axis=1, workers=self.workers)
+            pxx = spec.real ** 2 + spec.imag ** 2
+
+            # Time column of every frame (monotonic, so reduceat can sum the runs):
+            col = (np.arange(f0, f1) * n_bin) // n_fr
+            start = np.flatnonzero(np.r_[True, col[1:] != col[:-1]])
+
+            img[col[start]] += np.add.reduceat(pxx, start, axis=0)
+            cnt[col[start]] += np.diff(np.r_[start, m])
+
+        img *= self.scale / cnt[:, None]
+        img[:, 0] /= 2
+        if self.nperseg % 2 == 0:
+            img[:, -1] /= 2
+
+        # Center time of every column:
+        t_bin = ((np.arange(n_bin) + 0.5) * n_fr / n_bin - 0.5) * self.step * self.samp + self.nperseg * self.samp / 2
+        freq = scipy.fft.rfftfreq(self.nperseg, self.samp)
+
+        return {'time': t_bin, 'freq': freq, 'psd': img}
+
+    # Spectrogram heatmap of an axis:
+
+    def plot(self, asse, x=None):
+
+        if x is None:
+            plotacc = PlotAcc(samp=self.samp, path=self.path)
+            src = plotacc.source()
+
+            # Memory-mapped field of a .npy recording (read block by block), whole column otherwise:
+            if src is not None:
+                x = src.data[asse]
+            else:
+                x = plotacc.extract_csv(columns=asse)[asse].to_numpy()
+
+        res = self.spectrogram(x)
+
+        if res is False:
+            return False
+
+        pio.templates.default = "none"
+
+        # Compact image: float32 dB values
+        psd_db = (10 * np.log10(res['psd'].T + 1e-12)).astype(np.float32)
+
+        fig = go.Figure(data=go.Heatmap(
+            x=np.round(res['time'], 3),
+            y=np.round(res['freq'], 3),
+            z=np.round(psd_db, 1),
+            colorscale='Viridis',
+            colorbar=dict(title="PSD [dB]"),
+            hovertemplate="Time: %{x:.2f} s<br>" + "Freq: %{y:.2f} Hz<br>" + "PSD: %{z:.1f} dB" + " <extra></extra>",
+        ))
+
+        fig.update_layout(
+            title="Spectrogram " + asse,
+            xaxis_title="Time [s]",
+            yaxis_title="Frequency [Hz]",
+            height=720, width=1480,
+        )
+
+        pio.write_html(fig, file=self.path + 'spectrogram ' + asse + '.html', auto_open=False)
+
+        return res
@@ -0,0 +1,154 @@
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from scipy import signal
+from plotly.subplots import make_subplots
+from graphic_plot import PlotAcc
+
+
+class TransferAcc:
+
+    def __init__(self,
+                 df=None,
+                 samp=0.005,
+                 nperseg=128,
+                 overlap=50,
+                 n_acc=4,
+                 axes=('x', 'z'),
+                 path='C:/'):
+
+        self.samp = samp                    # 0.005 # Sampleperiod: samp=1/samplerate
+        self.nperseg = nperseg              # 128   # Number of samples of each Welch segment
+        self.overlap = overlap              # 50    # Overlap between consecutive segments (percentage)
+        self.n_acc = n_acc                  # 4     # Number of accelerometers
+        self.axes = axes                    # Acquired axes of every accelerometer
+        self.path = path                    # path of the .csv file
+
+        # Channel names, ordered by axis and then by accelerometer (Ax_1..Ax_4, Az_1..Az_4):
+        self.channels = ['A' + ax + '_' + str(n + 1) for ax in self.axes for n in range(self.n_acc)]
+
+        if df is None:
+            df = PlotAcc(samp=samp, path=path).extract_csv(columns=self.channels)
+
+        self.data = np.asarray(df[self.channels], dtype=float).T
+
+        self.spec = None
+
+    # Segmented FFT of every channel (computed once and shared by all the pairs):
+
+    def segments(self):
+
+        step = self.nperseg - int(self.nperseg * self.overlap / 100)
+        window = signal.windows.hann(self.nperseg, sym=False)
+
+        # (channels, segments, nperseg) view of the recording, no copy:
+        seg = np.lib.stride_tricks.sliding_window_view(self.data, self.nperseg, axis=1)[:, ::step]
+
+        if seg.shape[1] == 0:
+            print('\n Error: recording shorter than one segment! \n')
+            return False
+
+        seg = seg - seg.mean(axis=2, keepdims=True)
+        fft = np.fft.rfft(seg * window, axis=2)
+
+        # One-sided density scaling:
+        scale = 2 * self.samp / np.sum(window ** 2)
+
+        return {'fft': fft, 'scale': scale}
+
+    # Welch cross-spectral density matrix of all the channel pairs:
+
+    def csd(self):
+
+        seg = self.segments()
+
+        if seg is False:
+            return False
+
+        fft = seg['fft']
+        n_seg = fft.shape[1]
+
+        # S[i, j, f] = mean over the segments of conj(X_i) * X_j
+        spec = np.einsum('isf,jsf->ijf', np.conj(fft), fft, optimize=True) * (seg['scale'] / n_seg)
+
+        # DC and Nyquist bins are not doubled:
+        spec[:, :, 0] /= 2
+        if self.nperseg % 2 == 0:
+            spec[:, :, -1] /= 2
+
+        freq = np.fft.rfftfreq(self.nperseg, self.samp)
+
+        self.spec = {'freq': freq, 'csd': spec, 'n_seg': n_seg}
+        return self.spec
+
+    # Transfer function (H1 estimator), phase and coherence of every pair:
+
+    def transfer(self):
+
+        if self.spec is None and self.csd() is False:
+            return False
+
+        spec = self.spec['csd']
+        auto = np.real(np.einsum('iif->if', spec))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            h = spec / auto[:, None, :]
+            coh = np.abs(spec) ** 2 / (auto[:, None, :] * auto[None, :, :])
+
+        return {'freq': self.spec['freq'],
+                'channels': self.channels,
+                'mag': np.abs(h),
+                'phase': np.degrees(np.angle(h)),
+                'coherence': np.nan_to_num(coh),
+                'n_seg': self.spec['n_seg']}
+
+    # Results of a single input/output pair (e.g. 'Az_1' floor -> 'Az_2' seat):
+
+    def pair(self, inp, out):
+
+        res = self.transfer()
+
+        if res is False:
+            return False
+
+        i = self.channels.index(inp)
+        j = self.channels.index(out)
+
+        return {'freq': res['freq'],
+                'mag': res['mag'][i, j],
+                'phase': res['phase'][i, j],
+                'coherence': res['coherence'][i, j]}
+
+    # Transfer function plot of a single pair:
+
+    def plot(self, inp, out):
+
+        res = self.pair(inp, out)
+
+        if res is False:
+            return False
+
+        pio.templates.default = "none"
+
+        fig = make_subplots(rows=3, cols=1, shared_xaxes=True,
+                            subplot_titles=("Magnitude " + inp + " -> " + out, "Phase " + inp + " -> " + out,
+                                            "Coherence " + inp + " -> " + out),
+                            )
+
+        fig.append_trace(go.Scatter(x=res['freq'], y=res['mag'], name="|H|", line=dict(color='#EB7122'),
+                                    hovertemplate="Freq: %{x:.2f} Hz<br>" + "|H|: %{y:.3f}" + " <extra></extra>"), 1, 1)
+        fig.append_trace(go.Scatter(x=res['freq'], y=res['phase'], name="Phase", line=dict(color='#7F7F7F'),
+                                    hovertemplate="Freq: %{x:.2f} Hz<br>" + "Phase: %{y:.1f} deg" + " <extra></extra>"), 2, 1)
+        fig.append_trace(go.Scatter(x=res['freq'], y=res['coherence'], name="Coherence", line=dict(color='blue'),
+                                    hovertemplate="Freq: %{x:.2f} Hz<br>" + "Coh: %{y:.3f}" + " <extra></extra>"), 3, 1)
+
+        fig.update_xaxes(title_text="Frequency [Hz]", row=3, col=1)
+        fig.update_yaxes(title_text="Magnitude [-]", row=1, col=1)
+        fig.update_yaxes(title_text="Phase [deg]", range=[-180, 180], row=2, col=1)
+        fig.update_yaxes(title_text="Coherence [-]", range=[0, 1.05], row=3, col=1)
+
+        fig.update_layout(height=1020, width=1480, legend_orientation="h")
+
+        pio.write_html(fig, file=self.path + 'transfer function ' + inp + ' ' + out + '.html', auto_open=False)
+
+        return res